@@ -109,6 +109,10 @@ SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 CART_SESSION_ID = 'cart'
+STOCK_RESERVATION_TTL_SECONDS = 15 * 60
+
+COPURCHASE_MATRIX_PATH = BASE_DIR / 'copurchase_matrix.npz'
+REPRICE_RUNS_DIR = BASE_DIR / 'reprice_runs'
 
 STATICFILES_DIRS = [
 	os.path.join(BASE_DIR , 'static')
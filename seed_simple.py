@@ -14,7 +14,8 @@ from decimal import Decimal
 import random
 from datetime import timedelta
 
-from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord, Remittance
+from store import ledger
+from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord
 
 def main():
     print("Starting data seeding...")
@@ -38,17 +39,20 @@ def main():
                 password='password123'
             )
             
-            Profile.objects.create(
+            Profile.objects.update_or_create(
                 user=user,
-                email=f"{username}@example.com",
-                country=f"Country{(existing_users + i) % 100}",
-                city=f"City{(existing_users + i) % 100}",
-                address=f"Address {(existing_users + i) % 1000}",
-                is_seller=random.choice([True, False]),
-                gender=random.choice(['male', 'female'])
+                defaults=dict(
+                    email=f"{username}@example.com",
+                    country=f"Country{(existing_users + i) % 100}",
+                    city=f"City{(existing_users + i) % 100}",
+                    address=f"Address {(existing_users + i) % 1000}",
+                    is_seller=random.choice([True, False]),
+                    gender=random.choice(['male', 'female']),
+                ),
             )
             
-            Wallet.objects.create(user=user, balance=Decimal('5000.00'))
+            wallet, _ = Wallet.objects.get_or_create(user=user)
+            ledger.post(wallet.id, Decimal('5000.00'), 'deposit', 'Opening balance')
             
             if (i + 1) % 50 == 0:
                 print(f"Created {i + 1} additional users")
@@ -143,9 +147,6 @@ def main():
             goods = random.choice(goods_list)
             buyer = random.choice(users)
             
-            buyer.wallet.balance += goods.selling_price
-            buyer.wallet.save()
-            
             order = OrderMaster.objects.create(
                 user=buyer,
                 shipping_address=f"Address {i+1}",
@@ -160,11 +161,17 @@ def main():
                 price=goods.selling_price
             )
             
-            buyer.wallet.balance -= goods.selling_price
-            buyer.wallet.save()
+            purchase = f'Purchase of {goods.product.name} from {goods.shop.name}'
+            if ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase, require_funds=True) is None:
+                ledger.post(buyer.wallet.id, goods.selling_price, 'deposit', 'Top-up for generated orders')
+                ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase)
             
-            goods.shop.owner.wallet.balance += goods.selling_price
-            goods.shop.owner.wallet.save()
+            ledger.post(
+                goods.shop.owner.wallet.id,
+                goods.selling_price,
+                'sale',
+                f'Sale of {goods.product.name} to {buyer.username}'
+            )
             
             if (i + 1) % 100 == 0:
                 print(f"Created {i + 1} transactions")
@@ -3,7 +3,8 @@ from __future__ import annotations
 
 import os
 import math
-import statistics
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
@@ -14,7 +15,9 @@ from django.conf import settings
 from django.utils import timezone
 from django.db.models import Sum, Avg, Count, Q, F
 
-from .models import Goods, Shop, Product, Review, SalesRecord
+from .models import Goods, Shop, Product, Review, SalesRecord, ProductPriceIndex
+from .price_index import competitor_median, price_position
+from .elasticity import elasticity_label, get_elasticities
 
 
 MIN_MARGIN_DEFAULT = 0.06
@@ -231,18 +234,7 @@ def _sales_velocity(goods: Goods, window_days: int = 30) -> float:
 
 
 def _competitor_price_position(goods: Goods) -> str:
-    others = Goods.objects.filter(product=goods.product, is_available=True).exclude(pk=goods.pk)
-    prices = [float(x.selling_price) for x in others if float(x.selling_price) > 0]
-    if not prices:
-        return 'unknown'
-    median_price = statistics.median(prices)
-    my_price = float(goods.selling_price)
-    if my_price > median_price * 1.03:
-        return 'pricier'
-    elif my_price < median_price * 0.97:
-        return 'cheaper'
-    else:
-        return 'equal'
+    return price_position(float(goods.selling_price), competitor_median(goods))
 
 
 def _avg_rating(product: Product) -> float:
@@ -264,8 +256,12 @@ def _profit_margin_level(goods: Goods) -> str:
     return 'very_high'
 
 
+def _trend_half_days(window_days: int = 60) -> int:
+    return max(min(window_days//2, 30), 14)
+
+
 def _trend_label(goods: Goods, window_days: int = 60) -> str:
-    half = max(min(window_days//2, 30), 14)
+    half = _trend_half_days(window_days)
     now = timezone.now()
     r1_from = now - timedelta(days=half)
     r2_from = now - timedelta(days=half*2)
@@ -275,7 +271,10 @@ def _trend_label(goods: Goods, window_days: int = 60) -> str:
 
     q_recent = recent.aggregate(total=Sum('quantity_sold'))['total'] or 0
     q_prev = prev.aggregate(total=Sum('quantity_sold'))['total'] or 0
+    return _trend_from_totals(q_recent, q_prev)
 
+
+def _trend_from_totals(q_recent: float, q_prev: float) -> str:
     if q_prev == 0 and q_recent == 0:
         return 'flat'
     if q_prev == 0 and q_recent > 0:
@@ -339,9 +338,13 @@ def _season_label(product: Product) -> str:
     return 'normal'
 
 
-def _elasticity_proxy(goods: Goods, window_days: int = 60) -> str:
-    pos = _competitor_price_position(goods)
-    r = _avg_rating(goods.product)
+def _estimated_elasticity(product_id: int) -> Optional[str]:
+    """Label from the log-log regression estimate, or None when the product has none."""
+    estimate = get_elasticities().get(product_id)
+    return elasticity_label(estimate[0]) if estimate else None
+
+
+def _elasticity_label(pos: str, r: float) -> str:
     if pos == 'pricier' and r < 3.5:
         return 'elastic'
     if pos == 'cheaper' and r >= 4.0:
@@ -349,43 +352,177 @@ def _elasticity_proxy(goods: Goods, window_days: int = 60) -> str:
     return 'elastic' if pos == 'pricier' else 'inelastic'
 
 
-def build_facts_for_goods(goods: Goods, window_days: int = 30) -> Dict[str, str]:
-    vpd = _sales_velocity(goods, window_days=window_days)
-    comp = _competitor_price_position(goods)
-    rating_val = _avg_rating(goods.product)
-    rating = _rating_label(rating_val)
-    favs = _favorites_label(_favorites_count(goods.product))
-    margin = _profit_margin_level(goods)
-    trend = _trend_label(goods, window_days=60)
-    stock = _stock_level_label(goods, vpd=vpd)
-    age = _age_label(goods.product)
-    season = _season_label(goods.product)
-    elast = _elasticity_proxy(goods)
+def _sales_label(vpd: float) -> str:
+    return 'low' if vpd < 0.06 else ('medium' if vpd < 0.25 else ('high' if vpd < 0.70 else 'very_high'))
 
-    sales = 'low' if vpd < 0.06 else ('medium' if vpd < 0.25 else ('high' if vpd < 0.70 else 'very_high'))
 
+def _assemble_facts(goods: Goods, vpd: float, comp: str, rating_val: float, favorites: int, trend: str, elasticity: Optional[str] = None) -> Dict[str, str]:
     return {
-        'sales': sales,
-        'stock': stock,
+        'sales': _sales_label(vpd),
+        'stock': _stock_level_label(goods, vpd=vpd),
         'competition': comp if comp != 'unknown' else 'equal',
-        'rating': rating,
-        'favorites': favs,
-        'margin': margin,
+        'rating': _rating_label(rating_val),
+        'favorites': _favorites_label(favorites),
+        'margin': _profit_margin_level(goods),
         'trend': trend,
-        'age': age,
-        'season': season,
-        'elasticity': elast
+        'age': _age_label(goods.product),
+        'season': _season_label(goods.product),
+        'elasticity': elasticity or _elasticity_label(comp, rating_val),
     }
 
 
-def recommend_for_goods(goods_id: int, window_days: int = 30, min_margin: Optional[float] = None) -> Dict[str, Any]:
-    goods = Goods.objects.select_related('product', 'shop').get(pk=goods_id)
-    facts = build_facts_for_goods(goods, window_days=window_days)
+class FactContext:
+    """Per-run memo of pricing features.
+
+    Each feature is computed at most once per goods (or product) and the time
+    spent computing it is accumulated per feature, so callers can see where a
+    recommendation's latency went.
+    """
+
+    def __init__(self):
+        self._memo: Dict[tuple, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+
+    @contextmanager
+    def measure(self, feature: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[feature] = self.timings.get(feature, 0.0) + time.perf_counter() - started
+            self.calls[feature] = self.calls.get(feature, 0) + 1
+
+    def _memoized(self, feature: str, key: tuple, compute):
+        memo_key = (feature,) + key
+        if memo_key in self._memo:
+            self.hits[feature] = self.hits.get(feature, 0) + 1
+            return self._memo[memo_key]
+        with self.measure(feature):
+            value = self._memo[memo_key] = compute()
+        return value
+
+    def sales_velocity(self, goods: Goods, window_days: int = 30) -> float:
+        return self._memoized('sales_velocity', (goods.pk, window_days), lambda: _sales_velocity(goods, window_days=window_days))
+
+    def competitor_position(self, goods: Goods) -> str:
+        return self._memoized('competitor_position', (goods.pk,), lambda: _competitor_price_position(goods))
+
+    def avg_rating(self, product: Product) -> float:
+        return self._memoized('avg_rating', (product.pk,), lambda: _avg_rating(product))
+
+    def favorites_count(self, product: Product) -> int:
+        return self._memoized('favorites_count', (product.pk,), lambda: _favorites_count(product))
+
+    def trend(self, goods: Goods, window_days: int = 60) -> str:
+        return self._memoized('trend', (goods.pk, window_days), lambda: _trend_label(goods, window_days=window_days))
+
+    def elasticity(self, goods: Goods) -> Optional[str]:
+        return self._memoized('elasticity', (goods.product_id,), lambda: _estimated_elasticity(goods.product_id))
+
+    def timing_report(self) -> List[Dict[str, Any]]:
+        """``[{feature, label, ms, calls, hits}]``, slowest first."""
+        report = [
+            {
+                'feature': f,
+                'label': f.replace('_', ' ').capitalize(),
+                'ms': round(t * 1000.0, 2),
+                'calls': self.calls.get(f, 0),
+                'hits': self.hits.get(f, 0),
+            }
+            for f, t in self.timings.items()
+        ]
+        return sorted(report, key=lambda r: r['ms'], reverse=True)
+
+
+def build_facts_for_goods(goods: Goods, window_days: int = 30, context: Optional[FactContext] = None) -> Dict[str, str]:
+    ctx = context or FactContext()
+    vpd = ctx.sales_velocity(goods, window_days=window_days)
+    comp = ctx.competitor_position(goods)
+    rating_val = ctx.avg_rating(goods.product)
+    favorites = ctx.favorites_count(goods.product)
+    trend = ctx.trend(goods, window_days=60)
+    elasticity = ctx.elasticity(goods)
+    return _assemble_facts(goods, vpd, comp, rating_val, favorites, trend, elasticity)
+
+
+def build_facts_for_shop(shop_id: int, window_days: int = 30, goods_list: Optional[List[Goods]] = None) -> Dict[int, Dict[str, str]]:
+    """Facts for every goods item of a shop, keyed by goods id.
+
+    Same facts as ``build_facts_for_goods`` but from five grouped queries for the
+    whole shop (goods, shop sales, price indexes, ratings, favorites) joined
+    in memory, instead of about ten aggregates per item.
+    """
+    from .models import Favorite
 
-    engine = PricingExpert()
-    engine.reset()
-    engine.declare(ProductFact(**facts))
-    engine.run()
+    if goods_list is None:
+        goods_list = list(Goods.objects.filter(shop_id=shop_id).select_related('product', 'shop'))
+    if not goods_list:
+        return {}
+    product_ids = {g.product_id for g in goods_list}
+
+    now = timezone.now()
+    half = _trend_half_days(60)
+    velocity_from = now - timedelta(days=window_days)
+    r1_from = now - timedelta(days=half)
+    r2_from = now - timedelta(days=half*2)
+    sales = {
+        row['product_id']: row
+        for row in SalesRecord.objects
+        .filter(shop_id=shop_id, product_id__in=product_ids, sale_date__gte=min(velocity_from, r2_from))
+        .values('product_id')
+        .annotate(
+            velocity=Sum('quantity_sold', filter=Q(sale_date__gte=velocity_from)),
+            recent=Sum('quantity_sold', filter=Q(sale_date__gte=r1_from)),
+            prev=Sum('quantity_sold', filter=Q(sale_date__gte=r2_from, sale_date__lt=r1_from)),
+        )
+        .order_by()
+    }
+
+    indexes = {ix.product_id: ix for ix in ProductPriceIndex.objects.filter(product_id__in=product_ids)}
+
+    ratings = dict(
+        Review.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(avg=Avg('rating')).order_by()
+        .values_list('product_id', 'avg')
+    )
+    favorites = dict(
+        Favorite.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(n=Count('id')).order_by()
+        .values_list('product_id', 'n')
+    )
+
+    elasticities = get_elasticities()
+    days = float(max(window_days, 1))
+    facts = {}
+    for g in goods_list:
+        row = sales.get(g.product_id, {})
+        vpd = float(row.get('velocity') or 0) / days
+        trend = _trend_from_totals(row.get('recent') or 0, row.get('prev') or 0)
+        comp = price_position(float(g.selling_price), competitor_median(g, indexes.get(g.product_id)))
+        rating_val = float(ratings.get(g.product_id) or 0.0)
+        estimate = elasticities.get(g.product_id)
+        elasticity = elasticity_label(estimate[0]) if estimate else None
+        facts[g.pk] = _assemble_facts(g, vpd, comp, rating_val, int(favorites.get(g.product_id, 0)), trend, elasticity)
+    return facts
+
+
+def recommend_for_goods(goods_id: int, window_days: int = 30, min_margin: Optional[float] = None, context: Optional[FactContext] = None) -> Dict[str, Any]:
+    ctx = context or FactContext()
+    with ctx.measure('load_goods'):
+        goods = Goods.objects.select_related('product', 'shop', 'product__price_index').get(pk=goods_id)
+    facts = build_facts_for_goods(goods, window_days=window_days, context=ctx)
+    return recommend_from_facts(goods, facts, min_margin=min_margin, context=ctx)
+
+
+def recommend_from_facts(goods: Goods, facts: Dict[str, str], min_margin: Optional[float] = None, context: Optional[FactContext] = None) -> Dict[str, Any]:
+    ctx = context or FactContext()
+    with ctx.measure('rule_engine'):
+        engine = PricingExpert()
+        engine.reset()
+        engine.declare(ProductFact(**facts))
+        engine.run()
 
     current_price = float(goods.selling_price)
     purchase_price = float(goods.purchase_price)
@@ -406,6 +543,22 @@ def recommend_for_goods(goods_id: int, window_days: int = 30, min_margin: Option
     return result
 
 
+def recommend_for_shop(shop_id: int, window_days: int = 30, min_margin: Optional[float] = None, engine: str = 'table') -> List[tuple]:
+    """``[(goods, recommendation)]`` for every goods item of a shop.
+
+    ``engine='table'`` evaluates the whole shop with the compiled decision table
+    (see ``pricing_decision_table``); ``'experta'`` runs the Rete engine per item.
+    """
+    goods_list = list(Goods.objects.filter(shop_id=shop_id).select_related('product', 'shop').order_by('pk'))
+    facts = build_facts_for_shop(shop_id, window_days=window_days, goods_list=goods_list)
+    if engine == 'table':
+        from .pricing_decision_table import recommend_batch
+        return list(zip(goods_list, recommend_batch(goods_list, [facts[g.pk] for g in goods_list], min_margin=min_margin)))
+    if engine != 'experta':
+        raise ValueError(f"Unknown pricing engine: {engine}")
+    return [(g, recommend_from_facts(g, facts[g.pk], min_margin=min_margin)) for g in goods_list]
+
+
 def apply_recommendation(goods_id: int, recommendation: Dict[str, Any], dry_run: bool = True) -> Dict[str, Any]:
     goods = Goods.objects.select_related('product', 'shop').get(pk=goods_id)
     action = recommendation.get('action')
@@ -415,6 +568,7 @@ def apply_recommendation(goods_id: int, recommendation: Dict[str, Any], dry_run:
     if action in ('increase', 'decrease') and suggested:
         if not dry_run:
             goods.selling_price = suggested
+            goods._price_change_source = 'recommendation'
             goods.save(update_fields=['selling_price'])
         return {
             'updated': not dry_run,
@@ -428,29 +582,50 @@ def apply_recommendation(goods_id: int, recommendation: Dict[str, Any], dry_run:
     }
 
 
-MANAGEMENT_COMMAND_SNIPPET = r"""
-from django.core.management.base import BaseCommand
-from store.EYAD_pricing_experta import recommend_for_goods, apply_recommendation
-from store.models import Goods
-
-class Command(BaseCommand):
-    help = "Run pricing expert system for all goods in a given shop"
-
-    def add_arguments(self, parser):
-        parser.add_argument('--shop-id', type=int, required=False)
-        parser.add_argument('--apply', action='store_true', help='Apply price updates (not dry-run)')
-        parser.add_argument('--window', type=int, default=30)
-        parser.add_argument('--min-margin', type=float, default=None)
-
-    def handle(self, *args, **opts):
-        qs = Goods.objects.all()
-        if opts.get('shop_id'):
-            qs = qs.filter(shop_id=opts['shop_id'])
-
-        for g in qs:
-            rec = recommend_for_goods(g.id, window_days=opts['window'], min_margin=opts['min_margin'])
-            self.stdout.write(f"Goods #{g.id} {g.product.name} @ {g.shop.name}: {rec}")
-            if opts['apply'] and rec['action'] in ('increase','decrease') and rec.get('suggested_price'):
-                res = apply_recommendation(g.id, rec, dry_run=False)
-                self.stdout.write(f"Applied: {res}")
-"""
+def apply_recommendations_bulk(recommendations: List[tuple]) -> List[Goods]:
+    """Apply ``[(goods, recommendation)]`` price changes with one ``bulk_update``.
+
+    Runs in a single transaction. Items whose price changed since they were
+    evaluated are skipped. ``bulk_update`` bypasses the Goods signals, so the
+    price history rows, the price index of touched products and the cached
+    recommendations are handled here. Returns the updated goods.
+    """
+    from decimal import Decimal
+    from django.db import transaction
+    from .models import PriceChange
+    from .price_index import rebuild_price_index
+    from .pricing_cache import invalidate_goods
+
+    wanted = {
+        g.pk: (g, rec['suggested_price'])
+        for g, rec in recommendations
+        if rec.get('action') in ('increase', 'decrease') and rec.get('suggested_price')
+    }
+    if not wanted:
+        return []
+
+    with transaction.atomic():
+        current = dict(
+            Goods.objects.select_for_update()
+            .filter(pk__in=list(wanted))
+            .values_list('pk', 'selling_price')
+        )
+        now = timezone.now()
+        changed, history = [], []
+        for pk, (g, suggested) in wanted.items():
+            if pk not in current or current[pk] != g.selling_price:
+                continue
+            new_price = Decimal(str(suggested))
+            if new_price == g.selling_price:
+                continue
+            history.append(PriceChange(goods=g, old_price=g.selling_price, new_price=new_price, source='reprice'))
+            g.selling_price = new_price
+            g._original_selling_price = new_price
+            g.updated_at = now
+            changed.append(g)
+        Goods.objects.bulk_update(changed, ['selling_price', 'updated_at'], batch_size=500)
+        PriceChange.objects.bulk_create(history, batch_size=500)
+        rebuild_price_index({g.product_id for g in changed})
+    for g in changed:
+        invalidate_goods(g.pk)
+    return changed
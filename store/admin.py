@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
+from . import ledger
 from .models import (
     Profile, Wallet, Remittance,
     Shop, Goods, Category, Product,
-    Favorite, Review, OrderMaster, OrderDetails, SalesRecord
+    Favorite, Review, OrderMaster, OrderDetails, SalesRecord,
+    ForecastScore, ProductPriceIndex, PriceChange, StockReservation, OrderOutbox, CartItem,
 )
 
 
@@ -18,18 +20,35 @@ class ProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ('user', 'balance', 'created_at')
+    list_display = ('user', 'balance', 'ledger_sequence', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    # Balances only move through ledger entries (add a Remittance instead).
+    readonly_fields = ('balance', 'ledger_sequence', 'created_at', 'updated_at')
 
 
 @admin.register(Remittance)
 class RemittanceAdmin(admin.ModelAdmin):
-    list_display = ('wallet', 'amount', 'transaction_type', 'created_at')
+    list_display = ('wallet', 'sequence', 'amount', 'transaction_type', 'balance_after', 'created_at')
     list_filter = ('transaction_type', 'created_at')
     search_fields = ('wallet__user__username', 'description')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('sequence', 'balance_after', 'created_at')
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('wallet', 'amount', 'transaction_type') + self.readonly_fields
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return super().save_model(request, obj, form, change)
+        # New entries go through the ledger so the balance, sequence and running balance move together.
+        posted = ledger.post(obj.wallet_id, obj.amount, obj.transaction_type, obj.description)
+        obj.pk, obj.sequence, obj.balance_after, obj.created_at = posted.pk, posted.sequence, posted.balance_after, posted.created_at
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting an entry would leave a gap in the sequence and desync the balance.
+        return False
 
 
 @admin.register(Shop)
@@ -87,10 +106,11 @@ class OrderDetailsInline(admin.TabularInline):
 
 @admin.register(OrderMaster)
 class OrderMasterAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'status', 'total_amount', 'order_date')
+    list_display = ('id', 'user', 'status', 'line_count', 'total_amount', 'order_date')
     list_filter = ('status', 'order_date')
     search_fields = ('user__username', 'shipping_address')
-    readonly_fields = ('order_date', 'total_amount')
+    readonly_fields = ('order_date', 'total_amount', 'line_count')
+    list_select_related = ('user',)
     inlines = [OrderDetailsInline]
     
     def save_formset(self, request, form, formset, change):
@@ -114,3 +134,61 @@ class SalesRecordAdmin(admin.ModelAdmin):
     search_fields = ('shop__name', 'product__name', 'order_detail__order__user__username')
     readonly_fields = ('sale_date',)
     date_hierarchy = 'sale_date'
+
+
+@admin.register(ForecastScore)
+class ForecastScoreAdmin(admin.ModelAdmin):
+    list_display = ('product', 'horizon_days', 'backend', 'score', 'recent_mean', 'forecast_mean', 'trained_at')
+    list_filter = ('horizon_days', 'backend', 'trained_at')
+    search_fields = ('product__name',)
+    readonly_fields = ('trained_at',)
+    exclude = ('model_json',)
+
+
+@admin.register(ProductPriceIndex)
+class ProductPriceIndexAdmin(admin.ModelAdmin):
+    list_display = ('product', 'offer_count', 'min_price', 'median_price', 'max_price', 'updated_at')
+    search_fields = ('product__name',)
+    readonly_fields = ('updated_at',)
+    exclude = ('prices',)
+
+
+@admin.register(PriceChange)
+class PriceChangeAdmin(admin.ModelAdmin):
+    list_display = ('goods', 'old_price', 'new_price', 'source', 'changed_at')
+    list_filter = ('source', 'changed_at')
+    search_fields = ('goods__product__name', 'goods__shop__name')
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('goods', 'user', 'quantity', 'expires_at', 'created_at')
+    list_filter = ('expires_at',)
+    search_fields = ('user__username', 'goods__product__name', 'goods__shop__name')
+    raw_id_fields = ('goods', 'user')
+
+
+@admin.register(OrderOutbox)
+class OrderOutboxAdmin(admin.ModelAdmin):
+    list_display = ('order', 'kind', 'created_at', 'processed_at', 'attempts')
+    list_filter = ('kind', 'processed_at')
+    search_fields = ('order__id', 'last_error')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'goods', 'quantity', 'unit_price', 'discount', 'updated_at')
+    search_fields = ('user__username', 'goods__product__name')
+    raw_id_fields = ('user', 'goods')
+    readonly_fields = ('added_at', 'updated_at')
@@ -0,0 +1,116 @@
+from datetime import date
+
+import numpy as np
+
+
+EPS = 1e-6
+YEAR_DAYS = 365
+YEARLY_FACTOR_BOUNDS = (0.25, 4.0)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def ordinals_to_dates(day_ordinals):
+    """Convert ``date.toordinal()`` values to a ``datetime64[D]`` array."""
+    return (np.asarray(day_ordinals) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def build_sales_matrix(product_ids, day_ordinals, quantities, end_ordinal=None):
+    """Pivot ``(product_id, day, qty)`` arrays into a dense float32 matrix.
+
+    Returns ``(row_product_ids, start_ordinal, matrix)``; column ``j`` holds the
+    quantity sold on day ``start_ordinal + j`` and the last column is
+    ``end_ordinal`` (defaults to the latest day present).
+    """
+    if len(product_ids) == 0:
+        return np.empty(0, dtype=np.int32), 0, np.zeros((0, 0), dtype=np.float32)
+
+    row_ids, rows = np.unique(product_ids, return_inverse=True)
+    start = int(day_ordinals.min())
+    end = int(day_ordinals.max()) if end_ordinal is None else int(end_ordinal)
+    keep = day_ordinals <= end
+    matrix = np.zeros((len(row_ids), end - start + 1), dtype=np.float32)
+    np.add.at(matrix, (rows[keep], day_ordinals[keep] - start), quantities[keep])
+    return row_ids.astype(np.int32), start, matrix
+
+
+def row_positions(row_ids, product_ids):
+    """Row of each product in the sorted ``row_ids`` index, or -1 when it has no sales."""
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    if len(row_ids) == 0:
+        return np.full(len(product_ids), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(row_ids, product_ids), len(row_ids) - 1)
+    return np.where(row_ids[pos] == product_ids, pos, -1)
+
+
+def sales_spans(matrix):
+    """Per-row ``(first, stop)`` columns bounding the days with sales, plus the count of such days.
+
+    Rows without sales get ``first == stop == 0``.
+    """
+    sold = matrix > 0
+    days_sold = np.count_nonzero(sold, axis=1)
+    first = np.argmax(sold, axis=1)
+    stop = matrix.shape[1] - np.argmax(sold[:, ::-1], axis=1)
+    empty = days_sold == 0
+    first[empty] = 0
+    stop[empty] = 0
+    return first, stop, days_sold
+
+
+def seasonal_naive_forecast(matrix, horizon_days=30, recent_window=30, season_weeks=4):
+    """Forecast ``horizon_days`` ahead for every row; returns a (products, horizon) array.
+
+    Each row's recent level is shaped by its weekday profile over the last
+    ``season_weeks`` weeks and, with a year of history, scaled by how sales
+    moved over the same horizon last year.
+    """
+    n_products, n_days = matrix.shape
+    if n_products == 0 or n_days == 0:
+        return np.zeros((n_products, horizon_days), dtype=np.float32)
+
+    window = min(recent_window, n_days)
+    level = matrix[:, -window:].mean(axis=1)
+
+    weeks = min(season_weeks, n_days // 7)
+    if weeks > 0:
+        profile = matrix[:, -weeks * 7:].reshape(n_products, weeks, 7).mean(axis=1)
+        profile_mean = profile.mean(axis=1, keepdims=True)
+        weekly_index = np.where(profile_mean > 0, profile / np.maximum(profile_mean, EPS), 1.0)
+    else:
+        weekly_index = np.ones((n_products, 7), dtype=np.float32)
+
+    yearly_factor = np.ones(n_products, dtype=np.float32)
+    if n_days >= YEAR_DAYS + window and horizon_days <= YEAR_DAYS:
+        anchor = n_days - YEAR_DAYS
+        last_year_recent = matrix[:, anchor - window:anchor].mean(axis=1)
+        last_year_ahead = matrix[:, anchor:anchor + horizon_days].mean(axis=1)
+        yearly_factor = np.clip(
+            (last_year_ahead + 1.0) / (last_year_recent + 1.0),
+            *YEARLY_FACTOR_BOUNDS,
+        ).astype(np.float32)
+
+    # Column 0 of the profile falls on the same weekday as the first forecast day.
+    cols = np.arange(horizon_days) % 7
+    return (level * yearly_factor)[:, None] * weekly_index[:, cols]
+
+
+def growth_summary(matrix, horizon_days=30, recent_window=30, min_history_days=30):
+    """Per-row ``(recent_mean, forecast_mean, score)`` arrays.
+
+    ``score`` is ``(forecast_mean - recent_mean) / recent_mean``; rows with fewer
+    than ``min_history_days`` days of sales get ``nan`` so the caller can skip
+    them, mirroring the Prophet path.
+    """
+    if matrix.shape[0] == 0:
+        empty = np.empty(0, dtype=np.float32)
+        return empty, empty, empty
+    window = min(recent_window, matrix.shape[1])
+    recent_mean = matrix[:, -window:].mean(axis=1)
+    forecast_mean = seasonal_naive_forecast(matrix, horizon_days, recent_window).mean(axis=1)
+    scores = (forecast_mean - recent_mean) / (recent_mean + EPS)
+    enough = np.count_nonzero(matrix, axis=1) >= min_history_days
+    return recent_mean, forecast_mean, np.where(enough, scores, np.nan).astype(np.float32)
+
+
+def growth_scores(matrix, horizon_days=30, recent_window=30, min_history_days=30):
+    return growth_summary(matrix, horizon_days, recent_window, min_history_days)[2]
@@ -1,53 +1,145 @@
 from decimal import Decimal
+from functools import cached_property
+
 from django.conf import settings
-from .models import Goods
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CartItem, Goods
+
+CENT = Decimal('0.01')
+
+
+def discounted_price(selling_price, discount):
+    return max(selling_price * (1 - Decimal(discount) / 100), Decimal('0')).quantize(CENT)
+
+
+class CartLineView:
+    """One cart line as templates and checkout see it: read-only, with its total precomputed."""
+    __slots__ = ('goods', 'quantity', 'price', 'previous_price', 'total_price')
+
+    def __init__(self, goods, quantity, price, previous_price=None):
+        for name, value in (
+            ('goods', goods),
+            ('quantity', quantity),
+            ('price', price),
+            ('previous_price', previous_price),
+            ('total_price', price * quantity),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("cart lines are read-only")
+
+    @property
+    def goods_id(self):
+        return self.goods.pk
+
 
 class Cart:
+    """The signed-in user's persistent cart, stored as CartItem rows.
+
+    Lines are loaded once per instance with one joined query (goods, product,
+    category, shop), repriced in bulk from the current Goods prices and exposed
+    as immutable ``CartLineView`` objects; line count, item count and total are
+    computed once until the cart is changed through this instance.
+    """
+
     def __init__(self, request):
+        self.user = request.user
+        self._adopt_session_cart(request.session)
 
-        self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
-
-    def add(self, goods, quantity=1, override_quantity=False):
-        goods_id = str(goods.id)
-        if goods_id not in self.cart:
-            self.cart[goods_id] = {'quantity': 0,
-                                    'price': str(goods.selling_price)}
-        if override_quantity:
-            self.cart[goods_id]['quantity'] = quantity
-        else:
-            self.cart[goods_id]['quantity'] += quantity
-        self.save()
-
-    def save(self):
-        self.session.modified = True
+    def _adopt_session_cart(self, session):
+        # Carts used to live in the session; move any left there into the table.
+        legacy = session.pop(settings.CART_SESSION_ID, None)
+        if not legacy:
+            return
+        prices = dict(Goods.objects.filter(pk__in=[int(k) for k in legacy]).values_list('pk', 'selling_price'))
+        for goods_id, item in legacy.items():
+            goods_id = int(goods_id)
+            if goods_id in prices and int(item.get('quantity', 0)) > 0:
+                discount = Decimal(str(item.get('discount', 0)))
+                CartItem.objects.get_or_create(
+                    user=self.user,
+                    goods_id=goods_id,
+                    defaults={
+                        'quantity': int(item['quantity']),
+                        'discount': discount,
+                        'unit_price': discounted_price(prices[goods_id], discount),
+                    },
+                )
+
+    def _changed(self):
+        for name in ('lines', 'summary'):
+            self.__dict__.pop(name, None)
+
+    def add(self, goods, quantity=1, override_quantity=False, discount=None):
+        price = discounted_price(goods.selling_price, discount or 0)
+        item, created = CartItem.objects.get_or_create(
+            user=self.user, goods=goods, defaults={'quantity': quantity, 'unit_price': price, 'discount': discount or 0}
+        )
+        if not created:
+            changes = {'quantity': quantity if override_quantity else F('quantity') + quantity, 'updated_at': timezone.now()}
+            if discount is not None:
+                changes.update(discount=discount, unit_price=price)
+            CartItem.objects.filter(pk=item.pk).update(**changes)
+        self._changed()
 
     def remove(self, goods):
-        goods_id = str(goods.id)
-        if goods_id in self.cart:
-            del self.cart[goods_id]
-            self.save()
+        CartItem.objects.filter(user=self.user, goods=goods).delete()
+        self._changed()
+
+    def clear(self):
+        CartItem.objects.filter(user=self.user).delete()
+        self._changed()
+
+    def quantity_of(self, goods):
+        if 'lines' in self.__dict__:
+            return next((line.quantity for line in self.lines if line.goods_id == goods.pk), 0)
+        return CartItem.objects.filter(user=self.user, goods=goods).values_list('quantity', flat=True).first() or 0
+
+    @cached_property
+    def lines(self):
+        """The cart as an immutable tuple of ``CartLineView``, built from one joined query."""
+        items = list(
+            CartItem.objects.filter(user=self.user)
+            .select_related('goods__product__category', 'goods__shop')
+            .order_by('added_at', 'id')
+        )
+        lines, repriced = [], []
+        for item in items:
+            price = discounted_price(item.goods.selling_price, item.discount)
+            previous = None
+            if price != item.unit_price:
+                previous, item.unit_price = item.unit_price, price
+                repriced.append(item)
+            lines.append(CartLineView(item.goods, item.quantity, price, previous))
+        if repriced:
+            CartItem.objects.bulk_update(repriced, ['unit_price'])
+        return tuple(lines)
+
+    @cached_property
+    def summary(self):
+        total = sum((line.total_price for line in self.lines), Decimal('0'))
+        return len(self.lines), sum(line.quantity for line in self.lines), total
+
+    @property
+    def line_count(self):
+        return self.summary[0]
+
+    @property
+    def item_count(self):
+        return self.summary[1]
+
+    @property
+    def total(self):
+        return self.summary[2]
 
     def __iter__(self):
-        goods_ids = self.cart.keys()
-        goods_list = Goods.objects.filter(id__in=goods_ids)
-        cart = self.cart.copy()
-        for goods in goods_list:
-            cart[str(goods.id)]['goods'] = goods
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+        return iter(self.lines)
 
     def __len__(self):
-        return sum(item['quantity'] for item in self.cart.values())
+        return self.item_count
 
     def get_total_price(self):
-        return sum(Decimal(item['price']) * item['quantity'] for item in self.cart.values())
-
-    def clear(self):
-        del self.session[settings.CART_SESSION_ID]
-        self.save() 
\ No newline at end of file
+        return self.total
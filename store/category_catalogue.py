@@ -0,0 +1,82 @@
+import threading
+
+from .category_seed import CATEGORY_SIMILARITY_MAP
+from .models import Category
+
+
+class CategoryCatalogue:
+    """Immutable in-memory snapshot of the Category table.
+
+    Holds lowercase name -> id, season -> category ids and category id ->
+    similar category ids so recommenders never resolve names per request.
+    """
+
+    def __init__(self, rows, season_map, similarity_map):
+        ids_by_name = {}
+        names_by_id = {}
+        for cid, name in sorted(rows):
+            names_by_id[cid] = name or ""
+            ids_by_name.setdefault((name or "").lower(), cid)
+        self.ids_by_name = ids_by_name
+        self.names_by_id = names_by_id
+
+        season_order = {}
+        season_sets = {}
+        for cat_name, seasons in season_map.items():
+            cid = ids_by_name.get(cat_name.lower())
+            if cid is None:
+                continue
+            for season in seasons:
+                season_order.setdefault(season, []).append(cid)
+        for cid, name in names_by_id.items():
+            for season in season_map.get(name.lower(), []):
+                season_sets.setdefault(season, set()).add(cid)
+        self._season_order = {s: tuple(ids) for s, ids in season_order.items()}
+        self._season_sets = {s: frozenset(ids) for s, ids in season_sets.items()}
+
+        similar = {}
+        for cid, name in names_by_id.items():
+            names = similarity_map.get(name, []) or similarity_map.get(name.title(), [])
+            if names:
+                similar[cid] = tuple(ids_by_name.get(n.lower()) for n in names)
+        self._similar = similar
+
+    def category_id(self, name):
+        return self.ids_by_name.get((name or "").lower())
+
+    def season_category_ids(self, season):
+        """Category ids mapped to ``season``, in CATEGORY_SEASON_MAP order."""
+        return self._season_order.get(season, ())
+
+    def in_season(self, category_id, season):
+        return category_id in self._season_sets.get(season, frozenset())
+
+    def similar_category_ids(self, category_id, limit=None):
+        """Similar category ids, taking the first ``limit`` names before dropping unknown ones."""
+        ids = self._similar.get(category_id, ())
+        if limit is not None:
+            ids = ids[:limit]
+        return [cid for cid in ids if cid is not None]
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def get_category_catalogue():
+    global _catalogue
+    catalogue = _catalogue
+    if catalogue is not None:
+        return catalogue
+    with _catalogue_lock:
+        if _catalogue is None:
+            from .seasonal_forecast_recommender import CATEGORY_SEASON_MAP
+            rows = list(Category.objects.values_list("id", "name"))
+            _catalogue = CategoryCatalogue(rows, CATEGORY_SEASON_MAP, CATEGORY_SIMILARITY_MAP)
+        return _catalogue
+
+
+def invalidate_category_catalogue():
+    global _catalogue
+    with _catalogue_lock:
+        _catalogue = None
@@ -0,0 +1,169 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+
+from . import ledger
+from .models import Goods, OrderMaster, OrderDetails, OrderOutbox, StockReservation, Wallet
+from .reservations import held_quantities
+
+
+CartLine = namedtuple("CartLine", ["goods_id", "quantity", "price"])
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, goods):
+        self.goods = goods
+        super().__init__(f"Not enough stock for {goods.product.name} at {goods.shop.name}")
+
+
+class InsufficientFunds(CheckoutError):
+    pass
+
+
+def lines_from_cart(cart):
+    """``CartLine`` tuples at the cart's current (repriced) unit prices."""
+    return [CartLine(line.goods_id, line.quantity, line.price) for line in cart.lines if line.quantity > 0]
+
+
+def existing_order(user, idempotency_key):
+    """The order ``user`` already placed with ``idempotency_key``, if any."""
+    if not idempotency_key:
+        return None
+    order = OrderMaster.objects.filter(idempotency_key=idempotency_key, user=user).first()
+    if order is not None:
+        order.replayed = True
+    return order
+
+
+def _replay(user, idempotency_key, quantities, total):
+    """The order already placed under ``idempotency_key``, checked against this payload.
+
+    The key is only matched within ``user``'s orders; reusing it for a
+    different cart or total raises ``CheckoutError`` instead of returning an
+    order that was never asked for.
+    """
+    order = existing_order(user, idempotency_key)
+    if order is None:
+        return None
+    placed = defaultdict(int)
+    for goods_id, quantity in order.details.values_list("goods_id", "quantity"):
+        placed[goods_id] += quantity
+    if placed != quantities or order.total_amount != total:
+        raise CheckoutError("This checkout was already submitted with a different cart.")
+    return order
+
+
+def place_order(user, lines, shipping_address, notes=None, payment_method="cod", idempotency_key=None):
+    """Create an order for ``lines`` in one transaction and return it.
+
+    With an ``idempotency_key``, a repeated call with the same lines returns
+    the order the first call created (flagged ``replayed``) instead of placing
+    another one; a different payload under the same key is rejected. Wallet
+    payments are checked against the balance before anything is written.
+
+    The affected Goods rows are locked in primary-key order, stock is
+    decremented with guarded ``F()`` updates that leave other buyers' active
+    reservations untouched and the buyer's own holds are consumed. Details are
+    bulk-created and a wallet payment is taken with a guarded update. Seller-side
+    accounting (sales records, seller credits, sale remittances) is queued as an
+    ``OrderOutbox`` event in the same transaction. Any failure (missing goods,
+    short stock, insufficient wallet balance) rolls the whole order back.
+    """
+    quantities = defaultdict(int)
+    for line in lines:
+        quantities[line.goods_id] += line.quantity
+    if not quantities:
+        raise CheckoutError("Your cart is empty.")
+    total = sum((line.price * line.quantity for line in lines), Decimal("0"))
+
+    order = _replay(user, idempotency_key, quantities, total)
+    if order is not None:
+        return order
+    wallet_id = None
+    if payment_method == "wallet":
+        # Cheap pre-check so a short wallet never locks goods or writes rows; the
+        # guarded debit in _place still decides under concurrency.
+        wallet_id, balance = Wallet.objects.filter(user=user).values_list("id", "balance").first() or (None, None)
+        if wallet_id is None or balance < total:
+            raise InsufficientFunds("Insufficient wallet balance.")
+
+    try:
+        order = _place(user, lines, quantities, total, shipping_address, notes, wallet_id, idempotency_key)
+    except IntegrityError:
+        # A concurrent submit with the same key won the unique constraint.
+        order = _replay(user, idempotency_key, quantities, total)
+        if order is None:
+            if idempotency_key and OrderMaster.objects.filter(idempotency_key=idempotency_key).exists():
+                raise CheckoutError("This checkout was already submitted.")
+            raise
+    return order
+
+
+def _place(user, lines, quantities, total, shipping_address, notes, wallet_id, idempotency_key):
+    with transaction.atomic():
+        goods = {
+            g.pk: g
+            for g in Goods.objects.select_for_update(of=("self",))
+            .select_related("shop", "product")
+            .filter(pk__in=sorted(quantities))
+            .order_by("pk")
+        }
+        if len(goods) != len(quantities):
+            raise CheckoutError("Some items in your cart are no longer available.")
+
+        held = held_quantities(quantities, exclude_user=user)
+        for goods_id in sorted(quantities):
+            qty = quantities[goods_id]
+            updated = Goods.objects.filter(pk=goods_id, stock__gte=qty + held.get(goods_id, 0)).update(
+                stock=F("stock") - qty,
+                is_available=Case(When(stock=qty, then=Value(False)), default=F("is_available")),
+            )
+            if not updated:
+                raise OutOfStock(goods[goods_id])
+        StockReservation.objects.filter(user=user, goods_id__in=quantities).delete()
+
+        order = OrderMaster.objects.create(
+            user=user,
+            shipping_address=shipping_address,
+            notes=notes,
+            idempotency_key=idempotency_key or None,
+            total_amount=total,
+            line_count=len(lines),
+            status="confirmed" if wallet_id else "pending",
+        )
+
+        OrderDetails.objects.bulk_create([
+            OrderDetails(order=order, goods=goods[line.goods_id], quantity=line.quantity, price=line.price * line.quantity)
+            for line in lines
+        ])
+
+        if wallet_id and ledger.post(
+            wallet_id, total, "purchase", f"Payment for order #{order.id}", require_funds=True
+        ) is None:
+            raise InsufficientFunds("Insufficient wallet balance.")
+
+        # Sales records and seller credits are settled in batches by process_outbox.
+        OrderOutbox.objects.create(order=order)
+
+        sold_out = [g for g in goods.values() if g.stock == quantities[g.pk]]
+        transaction.on_commit(lambda: _after_commit(goods.values(), sold_out))
+
+    return order
+
+
+def _after_commit(goods, sold_out):
+    # Queryset updates skip the model signals.
+    from .price_index import refresh_price_index
+    from .pricing_cache import invalidate_goods, invalidate_item
+
+    for g in goods:
+        invalidate_goods(g.pk)
+        invalidate_item(g.shop_id, g.product_id)
+    for product_id in {g.product_id for g in sold_out}:
+        refresh_price_index(product_id)
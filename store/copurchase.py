@@ -0,0 +1,208 @@
+import os
+import tempfile
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import cached_property
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import OrderDetails
+
+
+def matrix_path():
+    return getattr(settings, "COPURCHASE_MATRIX_PATH", os.path.join(settings.BASE_DIR, "copurchase_matrix.npz"))
+
+
+def _order_rows(size, **order_date_filter):
+    """Quantities of the orders matching ``order_date_filter``, one sparse row per order.
+
+    Returns ``(order_ids, order_times, matrix)`` where ``matrix[k, p]`` is the
+    quantity of product ``p`` in order ``order_ids[k]``, placed at
+    ``order_times[k]`` (a POSIX timestamp).
+    """
+    order_buf = array("q")
+    time_buf = array("d")
+    pid_buf = array("q")
+    qty_buf = array("q")
+    qs = (
+        OrderDetails.objects
+        .filter(**{f"order__order_date__{k}": v for k, v in order_date_filter.items()})
+        .values_list("order_id", "order__order_date", "goods__product_id", "quantity")
+        .order_by()
+    )
+    for order_id, order_date, pid, qty in qs.iterator(chunk_size=5000):
+        if pid is None:
+            continue
+        order_buf.append(order_id)
+        time_buf.append(order_date.timestamp())
+        pid_buf.append(pid)
+        qty_buf.append(qty or 0)
+
+    pids = np.frombuffer(pid_buf, dtype=np.int64)
+    size = max(size, int(pids.max()) + 1 if len(pids) else 0)
+    if not len(pids):
+        return np.zeros(0, dtype=np.int64), np.zeros(0), sparse.csr_matrix((0, size), dtype=np.int64)
+
+    order_ids, first, order_idx = np.unique(
+        np.frombuffer(order_buf, dtype=np.int64), return_index=True, return_inverse=True
+    )
+    matrix = sparse.csr_matrix(
+        (np.frombuffer(qty_buf, dtype=np.int64), (order_idx, pids)),
+        shape=(len(order_ids), size),
+    )
+    matrix.sum_duplicates()
+    return order_ids, np.frombuffer(time_buf, dtype=np.float64)[first], matrix
+
+
+def _widen(matrix, size):
+    if matrix.shape[1] >= size:
+        return matrix
+    matrix = matrix.tocsr(copy=True)
+    matrix.resize((matrix.shape[0], size))
+    return matrix
+
+
+class CoPurchaseMatrix:
+    """Sparse order x product quantities over a rolling window of orders.
+
+    Orders stay as rows so a lookup can find the distinct orders holding any of
+    a user's products and sum each of them once.
+    """
+
+    def __init__(self, matrix, order_ids, order_times, window_days, window_start, built_through):
+        self.matrix = matrix
+        self.order_ids = order_ids
+        self.order_times = order_times
+        self.window_days = window_days
+        self.window_start = window_start
+        self.built_through = built_through
+
+    @classmethod
+    def build(cls, window_days, now=None):
+        now = now or timezone.now()
+        start = now - timedelta(days=window_days)
+        order_ids, order_times, matrix = _order_rows(0, gte=start, lte=now)
+        return cls(matrix, order_ids, order_times, window_days, start, now)
+
+    def refresh(self, now=None):
+        """Slide the window to ``now``: append newly placed orders, drop expired ones."""
+        now = now or timezone.now()
+        start = now - timedelta(days=self.window_days)
+        order_ids, order_times, added = _order_rows(self.matrix.shape[1], gt=self.built_through, lte=now)
+        keep = np.flatnonzero(self.order_times >= start.timestamp())
+        size = max(self.matrix.shape[1], added.shape[1])
+        self.matrix = sparse.vstack([_widen(self.matrix[keep], size), _widen(added, size)], format="csr")
+        self.order_ids = np.concatenate([self.order_ids[keep], order_ids])
+        self.order_times = np.concatenate([self.order_times[keep], order_times])
+        self.window_start = start
+        self.built_through = now
+        self.__dict__.pop("_by_product", None)
+        return self
+
+    @cached_property
+    def _by_product(self):
+        return self.matrix.tocsc()
+
+    def copurchased_with(self, product_ids, limit=60):
+        """``[(product_id, quantity)]`` bought alongside ``product_ids``, best first.
+
+        Sums the quantities over the distinct orders that contain any of
+        ``product_ids``; the products themselves are excluded.
+        """
+        size = self.matrix.shape[1]
+        cols = sorted({int(p) for p in product_ids if p is not None and 0 <= int(p) < size})
+        if not cols:
+            return []
+        related = np.unique(self._by_product[:, cols].indices)
+        if not len(related):
+            return []
+        totals = np.asarray(self.matrix[related].sum(axis=0)).ravel()
+        totals[cols] = 0
+        candidates = np.flatnonzero(totals > 0)
+        order = np.lexsort((candidates, -totals[candidates]))[:limit]
+        return [(int(candidates[i]), int(totals[candidates[i]])) for i in order]
+
+    def save(self, path=None):
+        path = path or matrix_path()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=directory)
+        os.close(fd)
+        np.savez(
+            tmp_path,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            order_ids=self.order_ids,
+            order_times=self.order_times,
+            window_days=np.array(self.window_days),
+            window_start=np.array(self.window_start.timestamp()),
+            built_through=np.array(self.built_through.timestamp()),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=None):
+        with np.load(path or matrix_path()) as f:
+            matrix = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            return cls(
+                matrix,
+                f["order_ids"],
+                f["order_times"],
+                int(f["window_days"]),
+                datetime.fromtimestamp(float(f["window_start"]), dt_timezone.utc),
+                datetime.fromtimestamp(float(f["built_through"]), dt_timezone.utc),
+            )
+
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def get_copurchase_matrix(window_days=180):
+    """The on-disk matrix for ``window_days``, reloaded when the file changes.
+
+    Requests only ever read the file; building and sliding it forward is left
+    to ``manage.py refresh_copurchase_matrix``. Returns None when there is no
+    usable file, so callers can fall back to ``copurchased_by_query``.
+    """
+    path = matrix_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _lock:
+        entry = _loaded.get(path)
+        if entry is None or mtime > entry[1]:
+            try:
+                entry = (CoPurchaseMatrix.load(path), mtime)
+            except Exception:
+                entry = (None, mtime)
+            _loaded[path] = entry
+    cm = entry[0]
+    return cm if cm is not None and cm.window_days == window_days else None
+
+
+def copurchased_by_query(product_ids, since, limit=60):
+    """``copurchased_with`` straight from the database, for when no matrix file is available."""
+    product_ids = [p for p in product_ids if p is not None]
+    related_order_ids = (
+        OrderDetails.objects
+        .filter(order__order_date__gte=since, goods__product_id__in=product_ids)
+        .values("order_id")
+    )
+    rows = (
+        OrderDetails.objects
+        .filter(order_id__in=related_order_ids)
+        .exclude(goods__product_id__in=product_ids)
+        .values_list("goods__product_id")
+        .annotate(total=Sum("quantity"))
+        .order_by("-total", "goods__product_id")[:limit]
+    )
+    return [(pid, int(total)) for pid, total in rows]
@@ -0,0 +1,99 @@
+from array import array
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .memory_cache import SizedLRUCache
+from .models import SalesRecord
+
+
+ELASTIC_THRESHOLD = -1.0
+MIN_OBSERVATIONS = 10
+MIN_PRICE_LEVELS = 3
+
+ELASTICITY_TTL_SECONDS = getattr(settings, "ELASTICITY_TTL_SECONDS", 6 * 60 * 60)
+
+_ESTIMATE_CACHE = SizedLRUCache(
+    max_bytes=getattr(settings, "ELASTICITY_CACHE_MAX_BYTES", 16 * 1024 * 1024),
+    ttl_seconds=ELASTICITY_TTL_SECONDS,
+    name="elasticity",
+)
+
+
+def fit_log_log(groups, prices, quantities, n_groups, min_observations=MIN_OBSERVATIONS, min_price_levels=MIN_PRICE_LEVELS):
+    """Per-group OLS slope of log(quantity) on log(price).
+
+    All groups are fitted at once from ``np.bincount`` sums. Returns
+    ``(slope, n_obs, r2)`` arrays of length ``n_groups``; groups with too few
+    observations or distinct prices get ``nan`` slopes.
+    """
+    keep = (prices > 0) & (quantities > 0)
+    groups, x, y = groups[keep], np.log(prices[keep]), np.log(quantities[keep])
+
+    n = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    sx = np.bincount(groups, weights=x, minlength=n_groups)
+    sy = np.bincount(groups, weights=y, minlength=n_groups)
+    sxx = np.bincount(groups, weights=x * x, minlength=n_groups)
+    syy = np.bincount(groups, weights=y * y, minlength=n_groups)
+    sxy = np.bincount(groups, weights=x * y, minlength=n_groups)
+
+    levels = np.zeros(n_groups, dtype=np.int64)
+    if len(groups):
+        pairs = np.unique(np.stack([groups, np.round(prices[keep], 2)]), axis=1)
+        levels = np.bincount(pairs[0].astype(np.int64), minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        cov = sxy - sx * sy / n
+        slope = cov / var_x
+        r2 = np.where(var_y > 0, cov * cov / (var_x * var_y), 0.0)
+
+    valid = (n >= min_observations) & (levels >= min_price_levels) & (var_x > 1e-12)
+    return np.where(valid, slope, np.nan), n.astype(np.int64), np.where(valid, r2, np.nan)
+
+
+def estimate_elasticities(days_back=365):
+    """``{product_id: (elasticity, n_obs, r2)}`` from SalesRecord unit prices and quantities."""
+    since = timezone.now() - timedelta(days=days_back)
+    pid_buf = array("q")
+    price_buf = array("d")
+    qty_buf = array("d")
+    qs = (
+        SalesRecord.objects
+        .filter(sale_date__gte=since)
+        .values_list("product_id", "unit_price", "quantity_sold")
+        .order_by()
+    )
+    for pid, price, qty in qs.iterator(chunk_size=5000):
+        pid_buf.append(pid)
+        price_buf.append(float(price or 0))
+        qty_buf.append(float(qty or 0))
+    if not len(pid_buf):
+        return {}
+
+    row_ids, groups = np.unique(np.frombuffer(pid_buf, dtype=np.int64), return_inverse=True)
+    slope, n_obs, r2 = fit_log_log(
+        groups, np.frombuffer(price_buf, dtype=np.float64), np.frombuffer(qty_buf, dtype=np.float64), len(row_ids)
+    )
+    return {
+        int(pid): (float(slope[i]), int(n_obs[i]), float(r2[i]))
+        for i, pid in enumerate(row_ids)
+        if not np.isnan(slope[i])
+    }
+
+
+def get_elasticities(days_back=365):
+    """``estimate_elasticities`` cached per process for ``ELASTICITY_TTL_SECONDS``.
+
+    Sales are settled by other processes, so there is no in-process
+    invalidation; estimates lag new sales by at most the TTL.
+    """
+    return _ESTIMATE_CACHE.get_or_compute(("elasticities", days_back), lambda: estimate_elasticities(days_back))
+
+
+def elasticity_label(value):
+    """'elastic' when demand falls faster than price rises (slope below -1)."""
+    return 'elastic' if value < ELASTIC_THRESHOLD else 'inelastic'
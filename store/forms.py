@@ -1,3 +1,5 @@
+import uuid
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
@@ -152,6 +154,8 @@ class CheckoutForm(forms.Form):
         widget=forms.RadioSelect,
         label='Payment Method'
     )
+    # Issued with the form and stored on the order, so a resubmitted POST finds the same order.
+    idempotency_key = forms.CharField(max_length=64, widget=forms.HiddenInput, initial=lambda: uuid.uuid4().hex)
 
 
 class AddGoodsToShopForm(forms.Form):
@@ -2,6 +2,8 @@ import pandas as pd
 from mlxtend.frequent_patterns import fpgrowth, association_rules
 from store.models import OrderDetails, Product, Goods
 
+BUNDLE_DISCOUNT_PERCENTAGE = 5
+
 def build_fp_model(user=None, min_support=0.01, min_threshold=0.2):
     qs = OrderDetails.objects.all().values("order__id", "goods__product_id")
     if user and user.is_authenticated:
@@ -54,13 +56,13 @@ def get_fp_recommendations_for_product(user, product_id, top_k=3):
     if len(recs) >= 3:
         selected = recs[:3]
         total_original_price = sum(item["price"] for item in selected)
-        discount_percentage = 5
+        discount_percentage = BUNDLE_DISCOUNT_PERCENTAGE
         bundle_price = total_original_price * (1 - discount_percentage/100)
     
     if len(recs) >= 3:
         selected = recs[:3]
         total_original = sum(item["price"] for item in selected if item["price"])
-        discount = 5
+        discount = BUNDLE_DISCOUNT_PERCENTAGE
         final_price = total_original * (1 - discount / 100)
 
         bundle_offers.append({
@@ -71,7 +73,7 @@ def get_fp_recommendations_for_product(user, product_id, top_k=3):
             "bundle_price": bundle_price,
             "total_savings": total_original_price - bundle_price,
             "discount_percentage": discount_percentage,
-            "description": "Special FP-Growth bundle with 5% off for 3 products."
+            "description": f"Special FP-Growth bundle with {discount_percentage}% off for 3 products."
         })
 
     return recs, bundle_offers
@@ -0,0 +1,143 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Remittance, Wallet
+
+
+Entry = namedtuple("Entry", ["wallet_id", "amount", "transaction_type", "description"])
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+
+
+def signed(transaction_type, amount):
+    return amount if transaction_type in Remittance.CREDIT_TYPES else -amount
+
+
+def post(wallet_id, amount, transaction_type, description=None, require_funds=False):
+    """Append one ledger entry and move the wallet balance with it.
+
+    Returns the new Remittance, or None if ``require_funds`` is set and the
+    balance cannot cover a debit.
+    """
+    delta = signed(transaction_type, amount)
+    with transaction.atomic():
+        wallets = Wallet.objects.filter(pk=wallet_id)
+        if require_funds and delta < 0:
+            wallets = wallets.filter(balance__gte=-delta)
+        if not wallets.update(balance=F("balance") + delta, ledger_sequence=F("ledger_sequence") + 1):
+            return None
+        balance, sequence = Wallet.objects.filter(pk=wallet_id).values_list("balance", "ledger_sequence").get()
+        return Remittance.objects.create(
+            wallet_id=wallet_id,
+            amount=amount,
+            transaction_type=transaction_type,
+            description=description,
+            sequence=sequence,
+            balance_after=balance,
+        )
+
+
+def post_many(entries):
+    """Settle many ``Entry`` tuples with one balance update per wallet.
+
+    Each wallet's entries are summed into a single ``F()`` update (wallets in
+    id order, so concurrent settlements cannot deadlock); sequence numbers and
+    running balances are then assigned in entry order and the rows are
+    bulk-created.
+    """
+    by_wallet = defaultdict(list)
+    for entry in entries:
+        by_wallet[entry.wallet_id].append(entry)
+
+    rows = []
+    with transaction.atomic():
+        for wallet_id in sorted(by_wallet):
+            items = by_wallet[wallet_id]
+            deltas = [signed(e.transaction_type, e.amount) for e in items]
+            total = sum(deltas, ZERO)
+            Wallet.objects.filter(pk=wallet_id).update(
+                balance=F("balance") + total, ledger_sequence=F("ledger_sequence") + len(items)
+            )
+            balance, last = Wallet.objects.filter(pk=wallet_id).values_list("balance", "ledger_sequence").get()
+            running, sequence = balance - total, last - len(items)
+            for entry, delta in zip(items, deltas):
+                running += delta
+                sequence += 1
+                rows.append(Remittance(
+                    wallet_id=wallet_id,
+                    amount=entry.amount,
+                    transaction_type=entry.transaction_type,
+                    description=entry.description,
+                    sequence=sequence,
+                    balance_after=running,
+                ))
+        return Remittance.objects.bulk_create(rows)
+
+
+def _with_ledger_totals(queryset):
+    money = DecimalField(max_digits=14, decimal_places=2)
+    credit = Q(remittances__transaction_type__in=Remittance.CREDIT_TYPES)
+    debit = Q(remittances__transaction_type__in=[t for t, _ in Remittance.TRANSACTION_TYPES if t not in Remittance.CREDIT_TYPES])
+    last_balance = Remittance.objects.filter(wallet=OuterRef("pk")).order_by("-sequence").values("balance_after")[:1]
+    return queryset.annotate(
+        credits=Coalesce(Sum("remittances__amount", filter=credit), Value(ZERO), output_field=money),
+        debits=Coalesce(Sum("remittances__amount", filter=debit), Value(ZERO), output_field=money),
+        entries=Count("remittances"),
+        first_sequence=Min("remittances__sequence"),
+        last_sequence=Max("remittances__sequence"),
+        last_balance=Subquery(last_balance, output_field=money),
+    )
+
+
+def reconcile(wallet_ids=None):
+    """Yield ``(wallet, problems)`` for wallets whose balance and ledger disagree.
+
+    Checks that the balance equals the signed sum of its entries and the
+    latest running balance, and that sequences run 1..n without gaps up to
+    ``Wallet.ledger_sequence``.
+    """
+    wallets = Wallet.objects.all()
+    if wallet_ids:
+        wallets = wallets.filter(pk__in=wallet_ids)
+    for wallet in _with_ledger_totals(wallets).order_by("pk").iterator(chunk_size=500):
+        problems = []
+        # SQLite sums decimals as floats; compare to the cent.
+        ledger_sum = (wallet.credits - wallet.debits).quantize(CENT)
+        if ledger_sum != wallet.balance:
+            problems.append(f"balance {wallet.balance} != ledger sum {ledger_sum}")
+        if wallet.entries and wallet.last_balance != wallet.balance:
+            problems.append(f"balance {wallet.balance} != last running balance {wallet.last_balance}")
+        if wallet.entries != wallet.ledger_sequence or (wallet.entries and (wallet.first_sequence, wallet.last_sequence) != (1, wallet.entries)):
+            problems.append(
+                f"{wallet.entries} entries numbered {wallet.first_sequence}..{wallet.last_sequence}, "
+                f"wallet sequence {wallet.ledger_sequence}"
+            )
+        if problems:
+            yield wallet, problems
+
+
+def adopt_balance(wallet_id):
+    """Record the gap between a wallet's balance and its ledger as an adjustment, leaving the balance as is.
+
+    For balances that were set outside the ledger, e.g. by seeding scripts.
+    """
+    with transaction.atomic():
+        Wallet.objects.select_for_update().filter(pk=wallet_id).values_list("pk").get()
+        wallet = _with_ledger_totals(Wallet.objects.filter(pk=wallet_id)).get()
+        gap = wallet.balance - (wallet.credits - wallet.debits).quantize(CENT)
+        if not gap:
+            return None
+        Wallet.objects.filter(pk=wallet_id).update(ledger_sequence=F("ledger_sequence") + 1)
+        return Remittance.objects.create(
+            wallet_id=wallet_id,
+            amount=gap,
+            transaction_type="adjustment",
+            description="Balance adopted into ledger",
+            sequence=wallet.ledger_sequence + 1,
+            balance_after=wallet.balance,
+        )
@@ -4,7 +4,8 @@ from decimal import Decimal
 import random
 from datetime import timedelta
 
-from store.models import Goods, User, OrderMaster, OrderDetails, SalesRecord, Remittance
+from store import ledger
+from store.models import Goods, User, OrderMaster, OrderDetails, SalesRecord
 
 class Command(BaseCommand):
     help = 'Add transactions to existing data'
@@ -37,15 +38,13 @@ class Command(BaseCommand):
                     continue
                 
                 buyer_wallet = buyer.wallet
-                if buyer_wallet.balance < goods.selling_price:
-                    buyer_wallet.balance += goods.selling_price * Decimal(2)
-                    buyer_wallet.save()
                 
                 order = OrderMaster.objects.create(
                     user=buyer,
                     shipping_address=f"Address {i+1}",
                     notes=f"Order note {i+1}",
                     total_amount=goods.selling_price,
+                    line_count=1,
                     status='confirmed',
                     order_date=timezone.now() - timedelta(days=random.randint(0, 365))
                 )
@@ -69,25 +68,16 @@ class Command(BaseCommand):
                     sale_date=order.order_date
                 )
                 
-                buyer_wallet.balance -= goods.selling_price
-                buyer_wallet.save()
+                purchase = f'Purchase of {goods.product.name} from {goods.shop.name}'
+                if ledger.post(buyer_wallet.id, goods.selling_price, 'purchase', purchase, require_funds=True) is None:
+                    ledger.post(buyer_wallet.id, goods.selling_price * Decimal(2), 'deposit', 'Top-up for generated orders')
+                    ledger.post(buyer_wallet.id, goods.selling_price, 'purchase', purchase)
                 
-                shop_owner_wallet = goods.shop.owner.wallet
-                shop_owner_wallet.balance += goods.selling_price
-                shop_owner_wallet.save()
-                
-                Remittance.objects.create(
-                    wallet=buyer_wallet,
-                    amount=goods.selling_price,
-                    transaction_type='purchase',
-                    description=f'Purchase of {goods.product.name} from {goods.shop.name}'
-                )
-                
-                Remittance.objects.create(
-                    wallet=shop_owner_wallet,
-                    amount=goods.selling_price,
-                    transaction_type='sale',
-                    description=f'Sale of {goods.product.name} to {buyer.username}'
+                ledger.post(
+                    goods.shop.owner.wallet.id,
+                    goods.selling_price,
+                    'sale',
+                    f'Sale of {goods.product.name} to {buyer.username}'
                 )
                 
                 goods.stock = max(0, goods.stock - 1)
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from django.core.management.base import BaseCommand
+
+from store import batch_forecaster
+from store import seasonal_forecast_recommender as sfr
+
+
+class Command(BaseCommand):
+    help = 'Compare the seasonal-naive batch forecaster with Prophet on a held-out horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=365 * 2, help='Sales history to load')
+        parser.add_argument('--horizon', type=int, default=30, help='Held-out days at the end of the history')
+        parser.add_argument('--products', type=int, default=20, help='Products to fit with Prophet (slowest part)')
+
+    def handle(self, *args, **options):
+        horizon = options['horizon']
+        row_ids, start, matrix = sfr.daily_sales_matrix(days_back=options['history_days'])
+        if matrix.shape[1] <= horizon + sfr.MIN_HISTORY_DAYS:
+            self.stdout.write(self.style.WARNING('Not enough history to hold out the requested horizon.'))
+            return
+
+        train, actual = matrix[:, :-horizon], matrix[:, -horizon:].mean(axis=1)
+        eligible = np.flatnonzero(np.count_nonzero(train, axis=1) >= sfr.MIN_HISTORY_DAYS)
+        self.stdout.write(f'{len(eligible)} products with >= {sfr.MIN_HISTORY_DAYS} days of sales, {train.shape[1]} training days')
+
+        started = time.perf_counter()
+        naive_mean = batch_forecaster.seasonal_naive_forecast(train, horizon_days=horizon).mean(axis=1)
+        naive_seconds = time.perf_counter() - started
+        self.report('seasonal_naive', naive_seconds, len(eligible), naive_mean[eligible], actual[eligible])
+
+        if not sfr.PROPHET_AVAILABLE:
+            self.stdout.write(self.style.WARNING('Prophet is not installed; skipping the Prophet comparison.'))
+            return
+
+        sample = eligible[np.argsort(-train[eligible].sum(axis=1))][:options['products']]
+        ds = pd.to_datetime(batch_forecaster.ordinals_to_dates(np.arange(train.shape[1]) + start))
+        prophet_mean = np.full(len(sample), np.nan, dtype=np.float64)
+        started = time.perf_counter()
+        for i, row in enumerate(sample):
+            m = sfr.new_prophet_model()
+            try:
+                m.fit(pd.DataFrame({'ds': ds, 'y': train[row]}))
+                fcst = m.predict(m.make_future_dataframe(periods=horizon, freq='D'))
+            except Exception:
+                continue
+            prophet_mean[i] = float(fcst.tail(horizon)['yhat'].mean())
+        prophet_seconds = time.perf_counter() - started
+
+        ok = ~np.isnan(prophet_mean)
+        self.report('prophet', prophet_seconds, int(ok.sum()), prophet_mean[ok], actual[sample][ok])
+        self.report('seasonal_naive (same products)', None, int(ok.sum()), naive_mean[sample][ok], actual[sample][ok])
+        if ok.sum() > 1:
+            corr = np.corrcoef(prophet_mean[ok], naive_mean[sample][ok])[0, 1]
+            self.stdout.write(f'Correlation of horizon means (prophet vs seasonal_naive): {corr:.3f}')
+
+    def report(self, name, seconds, count, predicted, actual):
+        if count == 0:
+            self.stdout.write(f'{name}: no products forecast')
+            return
+        mae = float(np.abs(predicted - actual).mean())
+        timing = '' if seconds is None else f', {seconds:.3f}s total, {seconds / count * 1000:.2f} ms/product'
+        self.stdout.write(f'{name}: {count} products, MAE of horizon mean {mae:.4f}{timing}')
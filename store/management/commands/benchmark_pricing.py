@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.EYAD_pricing_experta import build_facts_for_shop, recommend_from_facts
+from store.models import Goods, Shop
+from store.pricing_decision_table import get_decision_table, recommend_batch
+
+
+class Command(BaseCommand):
+    help = 'Compare experta and the compiled decision table on real shop facts (throughput and parity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=10, help='Number of shops to evaluate')
+        parser.add_argument('--window', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=3, help='Table evaluations to average over')
+
+    def handle(self, *args, **options):
+        goods_list, facts_list = [], []
+        for shop_id in Shop.objects.order_by('pk').values_list('pk', flat=True)[:options['shops']]:
+            shop_goods = list(Goods.objects.filter(shop_id=shop_id).select_related('product', 'shop').order_by('pk'))
+            facts = build_facts_for_shop(shop_id, window_days=options['window'], goods_list=shop_goods)
+            goods_list.extend(shop_goods)
+            facts_list.extend(facts[g.pk] for g in shop_goods)
+        if not goods_list:
+            self.stdout.write(self.style.WARNING('No goods to evaluate.'))
+            return
+        n = len(goods_list)
+        self.stdout.write(f'{n} goods from up to {options["shops"]} shops')
+
+        started = time.perf_counter()
+        expected = [recommend_from_facts(g, f) for g, f in zip(goods_list, facts_list)]
+        experta_seconds = time.perf_counter() - started
+
+        get_decision_table()
+        started = time.perf_counter()
+        for _ in range(max(1, options['repeat'])):
+            actual = recommend_batch(goods_list, facts_list)
+        table_seconds = (time.perf_counter() - started) / max(1, options['repeat'])
+
+        mismatches = sum(
+            1 for e, a in zip(expected, actual)
+            if e['action'] != a['action']
+            or e['suggested_price'] != a['suggested_price']
+            or sorted(e['reasons']) != sorted(a['reasons'])
+        )
+        self.stdout.write(f'experta: {experta_seconds:.3f}s, {n / experta_seconds:,.0f} goods/s')
+        self.stdout.write(f'table:   {table_seconds:.3f}s, {n / table_seconds:,.0f} goods/s ({experta_seconds / table_seconds:.1f}x)')
+        style = self.style.SUCCESS if mismatches == 0 else self.style.ERROR
+        self.stdout.write(style(f'{mismatches} mismatching recommendations'))
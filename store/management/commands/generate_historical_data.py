@@ -2,7 +2,8 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import transaction
-from store.models import Category, Product, Shop, Goods, Wallet, OrderMaster, OrderDetails, Remittance, Favorite, Review, Profile
+from store import ledger
+from store.models import Category, Product, Shop, Goods, Wallet, OrderMaster, OrderDetails, Favorite, Review, Profile
 from store.category_seed import ALL_CATEGORIES, CATEGORY_SIMILARITY_MAP
 import random
 from datetime import datetime, timedelta
@@ -212,14 +213,10 @@ class Command(BaseCommand):
                 profile.address = f"{random.randint(100, 9999)} {random.choice(['Main St', 'Oak Ave', 'Pine Rd', 'Elm St', 'Maple Dr'])}"
                 profile.save()
                 
-                wallet = Wallet.objects.create(user=user, balance=decimal.Decimal(str(random.uniform(0, 1000))))
+                wallet, _ = Wallet.objects.get_or_create(user=user)
                 if random.random() > 0.3:  # 70% chance of having some balance
-                    Remittance.objects.create(
-                        wallet=wallet,
-                        amount=wallet.balance,
-                        transaction_type='deposit',
-                        description='Initial deposit'
-                    )
+                    amount = decimal.Decimal(str(random.uniform(0, 1000))).quantize(ledger.CENT)
+                    ledger.post(wallet.id, amount, 'deposit', 'Initial deposit')
             
             users.append(user)
             if created:
@@ -317,6 +314,7 @@ class Command(BaseCommand):
             num_items = random.randint(1, 4)
             order_items = random.sample(goods_list, min(num_items, len(goods_list)))
             total_amount = decimal.Decimal('0.00')
+            line_count = 0
             
             for goods in order_items:
                 if goods.stock <= 0:
@@ -333,6 +331,7 @@ class Command(BaseCommand):
                 )
                 
                 total_amount += price * decimal.Decimal(str(quantity))
+                line_count += 1
                 
                 goods.stock -= quantity
                 if goods.stock <= 0:
@@ -340,20 +339,13 @@ class Command(BaseCommand):
                 goods.save()
             
             order.total_amount = total_amount
+            order.line_count = line_count
             order.save()
             
             if order.status in ['confirmed', 'shipped', 'delivered']:
-                wallet = user.wallet
-                if wallet.balance >= total_amount:
-                    wallet.balance -= total_amount
-                    wallet.save()
-                    
-                    Remittance.objects.create(
-                        wallet=wallet,
-                        amount=total_amount,
-                        transaction_type='purchase',
-                        description=f'Payment for order #{order.id}'
-                    )
+                ledger.post(
+                    user.wallet.id, total_amount, 'purchase', f'Payment for order #{order.id}', require_funds=True
+                )
             
             if i % 50 == 0:
                 self.stdout.write(f'Created {i+1} orders...')
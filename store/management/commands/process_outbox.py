@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.outbox import pending_events, process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Settle queued orders: sales records, seller wallet credits and sale remittances, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--every', type=float, default=0,
+                            help='Keep running, polling every N seconds once the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = failed = 0
+            started = time.time()
+            while True:
+                done, errors = process_outbox(options['batch_size'])
+                processed += done
+                failed += errors
+                if not done and not errors:
+                    break
+            if processed or failed or not options['every']:
+                self.stdout.write(f'Settled {processed} orders in {time.time() - started:.2f}s'
+                                  + (f', {failed} failed' if failed else ''))
+            if not options['every']:
+                stuck = pending_events().exclude(last_error=None).count()
+                if stuck:
+                    self.stdout.write(self.style.WARNING(f'{stuck} orders are waiting for a retry'))
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.price_index import rebuild_price_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-product price summaries (after bulk Goods writes that skip signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, nargs='*', help='Only these product ids')
+
+    def handle(self, *args, **options):
+        started = time.time()
+        count = rebuild_price_index(options['products'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt price index for {count} products in {time.time() - started:.2f}s'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.ledger import adopt_balance, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Check that every wallet balance equals its ledger sum, latest running balance and entry count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, nargs='*', help='Only these wallet ids')
+        parser.add_argument('--adopt', action='store_true',
+                            help='Record balances set outside the ledger (e.g. by seeding) as adjustment entries')
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        for wallet, problems in list(reconcile(options['wallets'])):
+            if options['adopt'] and adopt_balance(wallet.pk) is not None and not list(reconcile([wallet.pk])):
+                self.stdout.write(f'Wallet #{wallet.pk}: adopted balance {wallet.balance} into the ledger')
+                continue
+            mismatched += 1
+            self.stdout.write(self.style.ERROR(f'Wallet #{wallet.pk} ({wallet.user_id}): ' + '; '.join(problems)))
+        if mismatched:
+            raise CommandError(f'{mismatched} wallets do not reconcile')
+        self.stdout.write(self.style.SUCCESS('All wallets reconcile with their ledgers'))
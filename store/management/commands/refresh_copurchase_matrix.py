@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.copurchase import CoPurchaseMatrix, matrix_path
+from store.seasonal_forecast_recommender import SEASONAL_CONFIG
+
+
+class Command(BaseCommand):
+    help = 'Build or incrementally refresh the on-disk co-purchase matrix that recommendation requests read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=SEASONAL_CONFIG.get('copurchase_days', 180), help='Rolling window in days')
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild from scratch instead of sliding the window')
+
+    def handle(self, *args, **options):
+        started = time.time()
+        path = matrix_path()
+        cm = None
+        if not options['rebuild']:
+            try:
+                cm = CoPurchaseMatrix.load(path)
+            except (OSError, ValueError, KeyError):
+                cm = None
+        if cm is None or cm.window_days != options['window']:
+            cm = CoPurchaseMatrix.build(options['window'])
+            mode = 'Built'
+        else:
+            cm.refresh()
+            mode = 'Refreshed'
+        cm.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'{mode} co-purchase matrix ({cm.matrix.shape[0]} orders, {cm.matrix.shape[1]} products) in {time.time() - started:.2f}s -> {path}'
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.reservations import sweep_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired cart stock reservations (run from cron, or with --every to keep sweeping)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help='Sweep again every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            released = sweep_expired()
+            self.stdout.write(f'Released {released} expired reservations')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
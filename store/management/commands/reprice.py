@@ -0,0 +1,143 @@
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.utils import timezone
+
+from store.EYAD_pricing_experta import recommend_for_shop, apply_recommendations_bulk
+from store.models import Shop
+
+
+REPORT_FIELDS = ['shop_id', 'goods_id', 'product', 'action', 'current_price', 'suggested_price', 'pct', 'applied', 'reasons']
+
+
+class Command(BaseCommand):
+    help = 'Reprice goods for all (or selected) shops in chunks on a worker pool; suitable for cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop-id', type=int, nargs='*', help='Only these shops')
+        parser.add_argument('--apply', action='store_true', help='Write price changes (default is a dry run)')
+        parser.add_argument('--window', type=int, default=30)
+        parser.add_argument('--min-margin', type=float, default=None)
+        parser.add_argument('--engine', choices=('table', 'experta'), default='table', help='Rule evaluator')
+        parser.add_argument('--chunk-size', type=int, default=10, help='Shops per worker task')
+        parser.add_argument('--workers', type=int, default=4, help='Worker threads')
+        parser.add_argument('--report', help='Write every recommendation to this .csv or .json file')
+        parser.add_argument('--manifest', help='Run manifest path (default: REPRICE_RUNS_DIR/<timestamp>.json)')
+
+    def handle(self, *args, **opts):
+        shops = Shop.objects.order_by('pk')
+        if opts['shop_id']:
+            shops = shops.filter(pk__in=opts['shop_id'])
+        shop_ids = list(shops.values_list('pk', flat=True))
+        if not shop_ids:
+            raise CommandError('No shops to reprice.')
+
+        chunk_size = max(1, opts['chunk_size'])
+        chunks = [shop_ids[i:i + chunk_size] for i in range(0, len(shop_ids), chunk_size)]
+        # SQLite allows a single writer; evaluation still runs in parallel.
+        self.write_lock = threading.Lock() if connection.vendor == 'sqlite' else nullcontext()
+        started_at = timezone.now()
+        started = time.perf_counter()
+
+        rows, errors = [], []
+        with ThreadPoolExecutor(max_workers=max(1, opts['workers'])) as pool:
+            futures = {pool.submit(self.process_chunk, chunk, opts): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk_rows, chunk_errors = future.result()
+                rows.extend(chunk_rows)
+                errors.extend(chunk_errors)
+                for shop_id, error in chunk_errors:
+                    self.stderr.write(f'Shop #{shop_id}: {error}')
+
+        duration = time.perf_counter() - started
+        rows.sort(key=lambda r: (r['shop_id'], r['goods_id']))
+        if opts['report']:
+            self.write_report(opts['report'], rows)
+
+        proposed = sum(1 for r in rows if r['action'] in ('increase', 'decrease') and r['suggested_price'])
+        manifest = {
+            'started_at': started_at.isoformat(),
+            'finished_at': timezone.now().isoformat(),
+            'duration_seconds': round(duration, 3),
+            'dry_run': not opts['apply'],
+            'engine': opts['engine'],
+            'workers': opts['workers'],
+            'chunk_size': chunk_size,
+            'shops': len(shop_ids),
+            'shops_failed': len(errors),
+            'goods_evaluated': len(rows),
+            'items_per_second': round(len(rows) / duration, 1) if duration > 0 else None,
+            'changes_proposed': proposed,
+            'changes_applied': sum(1 for r in rows if r['applied']),
+            'report': opts['report'],
+            'errors': [{'shop_id': shop_id, 'error': error} for shop_id, error in errors],
+        }
+        manifest_path = self.write_manifest(opts['manifest'], manifest, started_at)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Applied' if opts['apply'] else 'Proposed'} {manifest['changes_applied'] if opts['apply'] else proposed} "
+            f"price changes across {len(rows)} goods in {duration:.2f}s "
+            f"({manifest['items_per_second']} goods/s); manifest: {manifest_path}"
+        ))
+        if errors:
+            raise CommandError(f'{len(errors)} shops failed; see {manifest_path}')
+
+    def process_chunk(self, shop_ids, opts):
+        rows, errors = [], []
+        close_old_connections()
+        try:
+            for shop_id in shop_ids:
+                try:
+                    recs = recommend_for_shop(
+                        shop_id, window_days=opts['window'], min_margin=opts['min_margin'], engine=opts['engine']
+                    )
+                    applied = set()
+                    if opts['apply']:
+                        with self.write_lock:
+                            applied = {g.pk for g in apply_recommendations_bulk(recs)}
+                except Exception as e:
+                    errors.append((shop_id, str(e)))
+                    continue
+                for g, rec in recs:
+                    rows.append({
+                        'shop_id': shop_id,
+                        'goods_id': g.pk,
+                        'product': g.product.name,
+                        'action': rec['action'],
+                        'current_price': rec['current_price'],
+                        'suggested_price': rec.get('suggested_price'),
+                        'pct': round(rec['pct'], 6),
+                        'applied': g.pk in applied,
+                        'reasons': rec['reasons'],
+                    })
+        finally:
+            connections.close_all()
+        return rows, errors
+
+    def write_report(self, path, rows):
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump(rows, f, indent=2)
+            return
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, reasons='; '.join(row['reasons'])))
+
+    def write_manifest(self, path, manifest, started_at):
+        if not path:
+            runs_dir = getattr(settings, 'REPRICE_RUNS_DIR', os.path.join(settings.BASE_DIR, 'reprice_runs'))
+            os.makedirs(runs_dir, exist_ok=True)
+            path = os.path.join(runs_dir, f"reprice-{started_at.strftime('%Y%m%dT%H%M%S')}.json")
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return path
@@ -0,0 +1,9 @@
+from store.management.commands.reprice import Command as RepriceCommand
+
+
+class Command(RepriceCommand):
+    help = 'Run the pricing expert system for all goods of a shop (or of every shop); single-threaded `reprice`'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(workers=1)
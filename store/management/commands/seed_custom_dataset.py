@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.db import transaction, connection
 from django.utils import timezone
 
+from store import ledger
 from store.models import (
     Profile,
     Wallet,
@@ -238,7 +239,8 @@ class Command(BaseCommand):
                 is_seller=False,  # set True for first 100 below
                 gender=gender,
             )
-            Wallet.objects.create(user=user, balance=Decimal("10000.00"))  # enough balance
+            wallet = Wallet.objects.create(user=user)
+            ledger.post(wallet.id, Decimal("10000.00"), "deposit", "Opening balance")  # enough balance
             users.append(user)
 
         for u in users[:100]:
@@ -426,6 +428,7 @@ class Command(BaseCommand):
                 goods_choices.append(random.choice(goods_by_product[pid]))
 
         total = Decimal('0.00')
+        line_count = 0
         for goods in goods_choices:
             if goods.stock <= 0:
                 continue
@@ -437,6 +440,7 @@ class Command(BaseCommand):
                 price=goods.selling_price,
             )
             total += goods.selling_price * Decimal(qty)
+            line_count += 1
             goods.stock = max(0, goods.stock - qty)
             if goods.stock == 0:
                 goods.is_available = False
@@ -454,7 +458,8 @@ class Command(BaseCommand):
             SalesRecord.objects.filter(pk=sr.pk).update(sale_date=order.order_date)
 
         order.total_amount = total.quantize(Decimal('0.01'))
-        order.save(update_fields=["total_amount"])
+        order.line_count = line_count
+        order.save(update_fields=["total_amount", "line_count"])
         return order
 
     def ensure_min_purchases_for_focus_products(self, users, goods_by_product, focus_products, min_per_product: int = 30):
@@ -7,7 +7,8 @@ from datetime import timedelta
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord, Remittance
+from store import ledger
+from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord
 
 class Command(BaseCommand):
     help = 'Seed comprehensive data: 500 users, 100 stores, 200 categories, 1000 products, 1000 transactions'
@@ -137,10 +138,9 @@ class Command(BaseCommand):
                 }
             )
             
-            wallet, created = Wallet.objects.get_or_create(
-                user=user,
-                defaults={'balance': Decimal(random.uniform(1000, 10000))}
-            )
+            wallet, created = Wallet.objects.get_or_create(user=user)
+            if not wallet.ledger_sequence:
+                ledger.post(wallet.id, Decimal(random.uniform(1000, 10000)).quantize(ledger.CENT), 'deposit', 'Opening balance')
             
             users_created += 1
             if users_created % 50 == 0:
@@ -262,16 +262,12 @@ class Command(BaseCommand):
             if not goods.is_available or goods.stock < 1:
                 continue
             
-            buyer_wallet = buyer.wallet
-            if buyer_wallet.balance < goods.selling_price:
-                buyer_wallet.balance += goods.selling_price * Decimal(2)
-                buyer_wallet.save()
-            
             order = OrderMaster.objects.create(
                 user=buyer,
                 shipping_address=f"Address {i+1}",
                 notes=f"Order note {i+1}",
                 total_amount=goods.selling_price,
+                line_count=1,
                 status='confirmed',
                 order_date=timezone.now() - timedelta(days=random.randint(0, 365))
             )
@@ -295,25 +291,16 @@ class Command(BaseCommand):
                 sale_date=order.order_date
             )
             
-            buyer_wallet.balance -= goods.selling_price
-            buyer_wallet.save()
-            
-            shop_owner_wallet = goods.shop.owner.wallet
-            shop_owner_wallet.balance += goods.selling_price
-            shop_owner_wallet.save()
-            
-            Remittance.objects.create(
-                wallet=buyer_wallet,
-                amount=goods.selling_price,
-                transaction_type='purchase',
-                description=f'Purchase of {goods.product.name} from {goods.shop.name}'
-            )
+            purchase = f'Purchase of {goods.product.name} from {goods.shop.name}'
+            if ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase, require_funds=True) is None:
+                ledger.post(buyer.wallet.id, goods.selling_price * Decimal(2), 'deposit', 'Top-up for generated orders')
+                ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase)
             
-            Remittance.objects.create(
-                wallet=shop_owner_wallet,
-                amount=goods.selling_price,
-                transaction_type='sale',
-                description=f'Sale of {goods.product.name} to {buyer.username}'
+            ledger.post(
+                goods.shop.owner.wallet.id,
+                goods.selling_price,
+                'sale',
+                f'Sale of {goods.product.name} to {buyer.username}'
             )
             
             goods.stock = max(0, goods.stock - 1)
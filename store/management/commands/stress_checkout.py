@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Sum
+
+from store import ledger
+from store.checkout import CartLine, CheckoutError, OutOfStock, InsufficientFunds, place_order
+from store.models import Goods, OrderDetails, Product, Shop, Wallet
+
+
+class Command(BaseCommand):
+    help = 'Race concurrent simulated buyers through checkout on low-stock goods and report throughput and overselling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=16, help='Concurrent buyer threads')
+        parser.add_argument('--orders', type=int, default=20, help='Checkout attempts per buyer')
+        parser.add_argument('--goods', type=int, default=3, help='Hot goods all buyers compete for')
+        parser.add_argument('--stock', type=int, default=50, help='Starting stock of each hot goods item')
+        parser.add_argument('--max-quantity', type=int, default=3, help='Upper bound of the quantity per line')
+        parser.add_argument('--lines', type=int, default=2, help='Upper bound of lines per order')
+        parser.add_argument('--payment', choices=('cod', 'wallet'), default='cod')
+        parser.add_argument('--retries', type=int, default=5, help='Retries on lock/deadlock errors')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated shop, goods, buyers and orders')
+
+    def handle(self, *args, **opts):
+        if opts['buyers'] < 1 or opts['goods'] < 1:
+            raise CommandError('--buyers and --goods must be positive.')
+        products = list(Product.objects.order_by('pk')[:opts['goods']])
+        if len(products) < opts['goods']:
+            raise CommandError('Not enough products to build the hot goods set.')
+
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create(username=f'stress-owner-{tag}')
+        shop = Shop.objects.create(owner=owner, name=f'Stress shop {tag}')
+        hot = [
+            Goods.objects.create(
+                shop=shop, product=p, purchase_price=Decimal('5.00'), selling_price=Decimal('10.00'), stock=opts['stock']
+            )
+            for p in products
+        ]
+        buyers = [User.objects.create(username=f'stress-buyer-{tag}-{i}') for i in range(opts['buyers'])]
+        # Wallets come from the User post_save handler; fund them so wallet payments never run dry.
+        for wallet_id in Wallet.objects.filter(user__in=buyers).values_list('id', flat=True):
+            ledger.post(wallet_id, Decimal('1000000'), 'deposit', 'Stress test funds')
+
+        try:
+            self.run(opts, buyers, hot)
+        finally:
+            if not opts['keep']:
+                shop.delete()
+                User.objects.filter(pk__in=[owner.pk] + [b.pk for b in buyers]).delete()
+
+    def run(self, opts, buyers, hot):
+        stats = {'ok': 0, 'out_of_stock': 0, 'failed': 0, 'retries': 0, 'deadlocks': 0, 'lock_timeouts': 0}
+        latencies = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(buyers))
+
+        def buyer_loop(index):
+            rng = random.Random(opts['seed'] * 100003 + index)
+            try:
+                start.wait()
+                for _ in range(opts['orders']):
+                    picks = rng.sample(hot, min(len(hot), rng.randint(1, opts['lines'])))
+                    lines = [CartLine(g.pk, rng.randint(1, opts['max_quantity']), g.selling_price) for g in picks]
+                    outcome, retries, deadlocks, timeouts, seconds = self.attempt(buyers[index], lines, opts)
+                    with lock:
+                        stats[outcome] += 1
+                        stats['retries'] += retries
+                        stats['deadlocks'] += deadlocks
+                        stats['lock_timeouts'] += timeouts
+                        latencies.append(seconds)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(buyers)) as pool:
+            list(pool.map(buyer_loop, range(len(buyers))))
+        elapsed = time.perf_counter() - started
+
+        lat = np.array(latencies) * 1000.0
+        self.stdout.write(f"{len(buyers)} buyers x {opts['orders']} attempts on {len(hot)} goods "
+                          f"(stock {opts['stock']} each) in {elapsed:.2f}s")
+        self.stdout.write(f"orders: {stats['ok']} placed, {stats['out_of_stock']} rejected (stock or funds), "
+                          f"{stats['failed']} failed; {stats['ok'] / elapsed:.1f} orders/s")
+        if len(lat):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            self.stdout.write(f"latency ms: p50 {p50:.1f}, p95 {p95:.1f}, p99 {p99:.1f}, max {lat.max():.1f}")
+        self.stdout.write(f"retries: {stats['retries']} (deadlocks {stats['deadlocks']}, "
+                          f"lock timeouts/busy {stats['lock_timeouts']})")
+
+        sold = dict(
+            OrderDetails.objects.filter(goods__in=hot).values('goods_id').annotate(q=Sum('quantity')).values_list('goods_id', 'q')
+        )
+        problems = 0
+        for g in hot:
+            final = Goods.objects.get(pk=g.pk).stock
+            sold_qty = sold.get(g.pk, 0)
+            if final < 0 or sold_qty > opts['stock'] or final != opts['stock'] - sold_qty:
+                problems += 1
+                self.stdout.write(self.style.ERROR(
+                    f"Goods #{g.pk}: start {opts['stock']}, sold {sold_qty}, final stock {final}"
+                ))
+        if problems:
+            self.stdout.write(self.style.ERROR(f'{problems} goods oversold or inconsistent'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No negative, oversold or inconsistent stock'))
+
+    def attempt(self, buyer, lines, opts):
+        retries = deadlocks = timeouts = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                place_order(buyer, lines, shipping_address='stress test', payment_method=opts['payment'])
+                outcome = 'ok'
+            except (OutOfStock, InsufficientFunds):
+                outcome = 'out_of_stock'
+            except CheckoutError:
+                outcome = 'failed'
+            except OperationalError as e:
+                message = str(e).lower()
+                if 'deadlock' in message:
+                    deadlocks += 1
+                else:
+                    timeouts += 1
+                if retries < opts['retries']:
+                    retries += 1
+                    time.sleep(random.uniform(0, 0.01 * 2 ** retries))
+                    continue
+                outcome = 'failed'
+            return outcome, retries, deadlocks, timeouts, time.perf_counter() - started
@@ -0,0 +1,104 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store import batch_forecaster
+from store import seasonal_forecast_recommender as sfr
+from store.models import ForecastScore
+
+
+class Command(BaseCommand):
+    help = 'Fit forecasts for candidate products in parallel and store their growth scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50, help='Number of top-selling products to forecast')
+        parser.add_argument('--days-back', type=int, default=365, help='Window used to pick top-selling products')
+        parser.add_argument('--history-days', type=int, default=365 * 2, help='Sales history fed to each model')
+        parser.add_argument('--horizon', type=int, default=30, help='Forecast horizon in days')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--no-models', action='store_true', help='Store scores only, skip serialized models')
+        parser.add_argument(
+            '--backend',
+            choices=('auto',) + sfr.FORECAST_BACKENDS,
+            default='auto',
+            help='Forecaster to use; auto picks Prophet when it is installed',
+        )
+
+    def handle(self, *args, **options):
+        backend = sfr.resolve_forecast_backend(options['backend'])
+        if backend == 'prophet' and not sfr.PROPHET_AVAILABLE:
+            raise CommandError('Prophet is not installed; use --backend seasonal_naive.')
+
+        started = time.time()
+        candidate_pids = sfr.top_selling_products(limit=options['products'], days_back=options['days_back'])
+        if not candidate_pids:
+            self.stdout.write(self.style.WARNING('No sales found; no candidates to forecast.'))
+            return
+
+        if backend == 'seasonal_naive':
+            results = self.score_seasonal_naive(candidate_pids, options)
+        else:
+            results = self.train_prophet(candidate_pids, options)
+
+        with transaction.atomic():
+            ForecastScore.objects.filter(horizon_days=options['horizon'], backend=backend).delete()
+            ForecastScore.objects.bulk_create([
+                ForecastScore(
+                    product_id=pid,
+                    horizon_days=options['horizon'],
+                    backend=backend,
+                    score=score,
+                    recent_mean=recent_mean,
+                    forecast_mean=forecast_mean,
+                    model_json=None if options['no_models'] else model_json,
+                )
+                for pid, score, recent_mean, forecast_mean, model_json in results
+            ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {len(results)} {backend} forecast scores in {time.time() - started:.1f}s'
+        ))
+
+    def score_seasonal_naive(self, candidate_pids, options):
+        row_ids, _, matrix = sfr.daily_sales_matrix(days_back=options['history_days'])
+        recent_mean, forecast_mean, scores = batch_forecaster.growth_summary(
+            matrix, horizon_days=options['horizon'], min_history_days=sfr.MIN_HISTORY_DAYS
+        )
+        wanted = set(candidate_pids)
+        return [
+            (int(pid), float(scores[i]), float(recent_mean[i]), float(forecast_mean[i]), None)
+            for i, pid in enumerate(row_ids)
+            if int(pid) in wanted and not np.isnan(scores[i])
+        ]
+
+    def train_prophet(self, candidate_pids, options):
+        series = sfr.sales_series_by_product(candidate_pids, days_back=options['history_days'])
+        self.stdout.write(f'Training {len(series)} of {len(candidate_pids)} candidates on {options["workers"]} workers...')
+
+        results = []
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = {
+                pool.submit(
+                    sfr.fit_forecast_for_series,
+                    pid,
+                    ds,
+                    y,
+                    options['horizon'],
+                ): pid
+                for pid, (ds, y) in series.items()
+            }
+            for future in as_completed(futures):
+                pid = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'Product #{pid}: training failed ({e})'))
+                    continue
+                if result is not None:
+                    results.append(result)
+        return results
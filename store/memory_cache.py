@@ -0,0 +1,172 @@
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(value):
+    """Approximate in-memory size of ``value`` in bytes."""
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, (str, bytes, int, float, bool)):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Flight:
+    __slots__ = ("event", "value", "error", "cancelled")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.cancelled = False
+
+
+class SizedLRUCache:
+    """Thread-safe LRU cache bounded by total estimated bytes, with TTL.
+
+    ``get_or_compute`` is single-flight: concurrent misses for the same key run
+    ``compute`` once and every waiter receives that result. ``None`` results are
+    returned but never stored, and neither are results whose key was deleted
+    (or the cache cleared) while they were being computed.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds=None, sizeof=estimate_size, name=""):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self.name = name
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at is not None and time.time() > expires_at:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl=None):
+        self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl, flight=None):
+        size = self.sizeof(value)
+        ttl = self.ttl_seconds if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            if flight is not None and flight.cancelled:
+                return
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            if flight.value is not None:
+                self._store(key, flight.value, ttl, flight)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.event.set()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # A computation already running may have read the data this delete
+            # invalidates: let it finish for its waiters, but never store it.
+            flight = self._flights.pop(key, None)
+            if flight is not None:
+                flight.cancelled = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for flight in self._flights.values():
+                flight.cancelled = True
+            self._flights.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_alter_orderdetails_goods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon_days', models.PositiveIntegerField(default=30)),
+                ('score', models.FloatField()),
+                ('recent_mean', models.FloatField(default=0)),
+                ('forecast_mean', models.FloatField(default=0)),
+                ('model_json', models.TextField(blank=True, null=True)),
+                ('trained_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_scores', to='store.product')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'unique_together': {('product', 'horizon_days')},
+            },
+        ),
+    ]
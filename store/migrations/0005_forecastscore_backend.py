@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_forecastscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastscore',
+            name='backend',
+            field=models.CharField(choices=[('prophet', 'Prophet'), ('seasonal_naive', 'Seasonal naive')], default='prophet', max_length=20),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_price_index(apps, schema_editor):
+    from store.price_index import summarize_prices
+
+    Goods = apps.get_model('store', 'Goods')
+    ProductPriceIndex = apps.get_model('store', 'ProductPriceIndex')
+    prices = {}
+    for product_id, price, available in Goods.objects.values_list('product_id', 'selling_price', 'is_available'):
+        offers = prices.setdefault(product_id, [])
+        if available:
+            offers.append(price)
+    ProductPriceIndex.objects.bulk_create(
+        [ProductPriceIndex(product_id=pid, **summarize_prices(offers)) for pid, offers in prices.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_forecastscore_backend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offer_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.FloatField(blank=True, null=True)),
+                ('p25_price', models.FloatField(blank=True, null=True)),
+                ('median_price', models.FloatField(blank=True, null=True)),
+                ('p75_price', models.FloatField(blank=True, null=True)),
+                ('max_price', models.FloatField(blank=True, null=True)),
+                ('prices', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='price_index', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Product price indexes',
+            },
+        ),
+        migrations.RunPython(build_price_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_productpriceindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('source', models.CharField(choices=[('manual', 'Manual edit'), ('recommendation', 'Pricing recommendation'), ('reprice', 'Scheduled reprice')], default='manual', max_length=20)),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('goods', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_changes', to='store.goods')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+            },
+        ),
+    ]
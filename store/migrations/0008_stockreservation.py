@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_pricechange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('goods', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='store.goods')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['goods', 'expires_at'], name='reservation_goods_expiry_idx'), models.Index(fields=['expires_at'], name='reservation_expiry_idx')],
+                'unique_together': {('goods', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_stockreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('seller_accounting', 'Seller accounting')], default='seller_accounting', max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='store.ordermaster')),
+            ],
+            options={
+                'verbose_name_plural': 'Order outbox',
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+CREDIT_TYPES = ('deposit', 'refund', 'sale', 'adjustment')
+
+
+def number_existing_entries(apps, schema_editor):
+    """Sequence existing remittances per wallet, with an opening adjustment for any unexplained balance."""
+    Wallet = apps.get_model('store', 'Wallet')
+    Remittance = apps.get_model('store', 'Remittance')
+
+    entries = {}
+    for r in Remittance.objects.order_by('wallet_id', 'created_at', 'id').iterator():
+        entries.setdefault(r.wallet_id, []).append(r)
+
+    updated, opening, wallets = [], [], []
+    for wallet in Wallet.objects.all().iterator():
+        rows = entries.get(wallet.pk, [])
+        deltas = [r.amount if r.transaction_type in CREDIT_TYPES else -r.amount for r in rows]
+        unexplained = wallet.balance - sum(deltas, Decimal('0'))
+        sequence = 0
+        running = Decimal('0')
+        if unexplained:
+            sequence += 1
+            running += unexplained
+            opening.append(Remittance(
+                wallet_id=wallet.pk, amount=unexplained, transaction_type='adjustment',
+                description='Opening balance', sequence=sequence, balance_after=running,
+            ))
+        for r, delta in zip(rows, deltas):
+            sequence += 1
+            running += delta
+            r.sequence, r.balance_after = sequence, running
+            updated.append(r)
+        wallet.ledger_sequence = sequence
+        wallets.append(wallet)
+
+    Remittance.objects.bulk_update(updated, ['sequence', 'balance_after'], batch_size=500)
+    Remittance.objects.bulk_create(opening, batch_size=500)
+    Wallet.objects.bulk_update(wallets, ['ledger_sequence'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_orderoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='ledger_sequence',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='remittance',
+            name='transaction_type',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('withdraw', 'Withdraw'), ('purchase', 'Purchase'), ('refund', 'Refund'), ('sale', 'Sale'), ('adjustment', 'Adjustment')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='remittance',
+            name='sequence',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='remittance',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='remittance',
+            name='sequence',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='remittance',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterUniqueTogether(
+            name='remittance',
+            unique_together={('wallet', 'sequence')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermaster',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
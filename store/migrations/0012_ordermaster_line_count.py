@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_lines(apps, schema_editor):
+    OrderMaster = apps.get_model('store', 'OrderMaster')
+    OrderDetails = apps.get_model('store', 'OrderDetails')
+    lines = OrderDetails.objects.filter(order=OuterRef('pk')).values('order').annotate(n=Count('pk')).values('n')
+    OrderMaster.objects.update(line_count=Coalesce(Subquery(lines), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_ordermaster_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermaster',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ordermaster',
+            index=models.Index(fields=['user', '-order_date', '-id'], name='order_history_idx'),
+        ),
+        migrations.RunPython(count_existing_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_ordermaster_line_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('goods', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='store.goods')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'goods')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_cartitem'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='forecastscore',
+            unique_together={('product', 'horizon_days', 'backend')},
+        ),
+    ]
@@ -31,6 +31,8 @@ class Profile(models.Model):
 class Wallet(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="wallet")
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Sequence number of the latest Remittance; advanced together with balance.
+    ledger_sequence = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -44,17 +46,31 @@ class Remittance(models.Model):
         ('withdraw', 'Withdraw'),
         ('purchase', 'Purchase'),
         ('refund', 'Refund'),
+        ('sale', 'Sale'),
+        ('adjustment', 'Adjustment'),
     ]
+    # Amounts are stored positive; these types add to the balance, the rest
+    # subtract. Adjustments carry their own sign.
+    CREDIT_TYPES = ('deposit', 'refund', 'sale', 'adjustment')
     
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="remittances")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     description = models.CharField(max_length=255, blank=True, null=True)
+    sequence = models.PositiveIntegerField()
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.transaction_type} - {self.amount}"
 
+    @property
+    def signed_amount(self):
+        return self.amount if self.transaction_type in self.CREDIT_TYPES else -self.amount
+
+    class Meta:
+        unique_together = ("wallet", "sequence")
+
 
 class Shop(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="shops")
@@ -158,16 +174,26 @@ class OrderMaster(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     shipping_address = models.TextField()
     notes = models.TextField(blank=True, null=True)
+    idempotency_key = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    # Denormalized from details so order lists never load them.
+    line_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Order {self.id} - {self.user.username}"
 
     def calculate_total(self):
-        total = sum(detail.price * detail.quantity for detail in self.details.all())
+        details = list(self.details.all())
+        total = sum(detail.price * detail.quantity for detail in details)
         self.total_amount = total
+        self.line_count = len(details)
         self.save()
         return total
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-order_date", "-id"], name="order_history_idx"),
+        ]
+
 
 class OrderDetails(models.Model):
     order = models.ForeignKey(OrderMaster, on_delete=models.CASCADE, related_name="details")
@@ -177,7 +203,7 @@ class OrderDetails(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.order.id} - {self.goods.product.name} x{self.quantity}"
+        return f"{self.order_id} - {self.goods.product.name} x{self.quantity}"
 
     class Meta:
         verbose_name_plural = "Order Details"
@@ -201,6 +227,138 @@ class SalesRecord(models.Model):
         ordering = ['-sale_date']
 
 
+class OrderOutbox(models.Model):
+    """Post-order work written with the order and drained by ``process_outbox``."""
+    KIND_CHOICES = [
+        ('seller_accounting', 'Seller accounting'),
+    ]
+
+    order = models.ForeignKey(OrderMaster, on_delete=models.CASCADE, related_name="outbox_events")
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, default='seller_accounting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.kind} for order {self.order_id} ({'done' if self.processed_at else 'pending'})"
+
+    class Meta:
+        verbose_name_plural = "Order outbox"
+        indexes = [
+            models.Index(fields=["processed_at", "id"], name="outbox_pending_idx"),
+        ]
+
+
+class ForecastScore(models.Model):
+    BACKEND_CHOICES = [
+        ('prophet', 'Prophet'),
+        ('seasonal_naive', 'Seasonal naive'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="forecast_scores")
+    horizon_days = models.PositiveIntegerField(default=30)
+    backend = models.CharField(max_length=20, choices=BACKEND_CHOICES, default='prophet')
+    score = models.FloatField()
+    recent_mean = models.FloatField(default=0)
+    forecast_mean = models.FloatField(default=0)
+    model_json = models.TextField(blank=True, null=True)
+    trained_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product.name} ({self.horizon_days}d, {self.backend}): {self.score:.3f}"
+
+    class Meta:
+        unique_together = ("product", "horizon_days", "backend")
+        ordering = ['-score']
+
+
+class ProductPriceIndex(models.Model):
+    """Price distribution of a product's available offers, kept current by Goods signals."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="price_index")
+    offer_count = models.PositiveIntegerField(default=0)
+    min_price = models.FloatField(null=True, blank=True)
+    p25_price = models.FloatField(null=True, blank=True)
+    median_price = models.FloatField(null=True, blank=True)
+    p75_price = models.FloatField(null=True, blank=True)
+    max_price = models.FloatField(null=True, blank=True)
+    prices = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product.name}: {self.offer_count} offers, median {self.median_price}"
+
+    class Meta:
+        verbose_name_plural = "Product price indexes"
+
+
+class PriceChange(models.Model):
+    """Append-only history of Goods selling-price changes."""
+    SOURCE_CHOICES = [
+        ('manual', 'Manual edit'),
+        ('recommendation', 'Pricing recommendation'),
+        ('reprice', 'Scheduled reprice'),
+    ]
+
+    goods = models.ForeignKey(Goods, on_delete=models.CASCADE, related_name="price_changes")
+    old_price = models.DecimalField(max_digits=12, decimal_places=2)
+    new_price = models.DecimalField(max_digits=12, decimal_places=2)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Price history is append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Price history is append-only")
+
+    def __str__(self):
+        return f"{self.goods_id}: {self.old_price} -> {self.new_price} ({self.source})"
+
+    class Meta:
+        ordering = ['-changed_at']
+
+
+class CartItem(models.Model):
+    """A line of a user's persistent cart."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart_items")
+    goods = models.ForeignKey(Goods, on_delete=models.CASCADE, related_name="cart_items")
+    quantity = models.PositiveIntegerField(default=1)
+    # Percent off the current selling price, e.g. from a bundle offer.
+    discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Price per unit as last shown to the buyer; refreshed from Goods when the cart is loaded.
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - goods #{self.goods_id} x{self.quantity}"
+
+    class Meta:
+        unique_together = ("user", "goods")
+
+
+class StockReservation(models.Model):
+    """Stock held for a buyer's cart until ``expires_at``."""
+    goods = models.ForeignKey(Goods, on_delete=models.CASCADE, related_name="reservations")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="stock_reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} holds {self.quantity} of goods #{self.goods_id} until {self.expires_at}"
+
+    class Meta:
+        unique_together = ("goods", "user")
+        indexes = [
+            models.Index(fields=["goods", "expires_at"], name="reservation_goods_expiry_idx"),
+            models.Index(fields=["expires_at"], name="reservation_expiry_idx"),
+        ]
+
+
 def get_shop_sales_methods():
     def get_sales_records(self, time_filter=None):
         from datetime import datetime, timedelta
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Prefetch, Q
+
+from .models import OrderDetails, OrderMaster
+
+
+ORDER_PAGE_SIZE = 20
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(order):
+    """Opaque ``<microseconds>.<id>`` position of ``order`` in the history."""
+    delta = order.order_date - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}.{order.pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        micros, pk = cursor.split(".")
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def order_history_page(user, cursor=None, page_size=ORDER_PAGE_SIZE):
+    """One page of ``user``'s orders, newest first, and the cursor of the next page (or None).
+
+    Keyset pagination on ``(order_date, id)`` walks the ``order_history_idx``
+    index, so deep pages cost the same single query as the first.
+    """
+    orders = OrderMaster.objects.filter(user=user).order_by("-order_date", "-id")
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        order_date, pk = position
+        orders = orders.filter(Q(order_date__lt=order_date) | Q(order_date=order_date, id__lt=pk))
+    page = list(orders[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def order_with_details(queryset=None):
+    """Orders with their details, goods, products and shops loaded in two queries."""
+    queryset = OrderMaster.objects.all() if queryset is None else queryset
+    return queryset.prefetch_related(
+        Prefetch("details", queryset=OrderDetails.objects.select_related("goods__product", "goods__shop").order_by("id"))
+    )
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ledger
+from .models import OrderDetails, OrderOutbox, SalesRecord, Wallet
+
+
+MAX_ATTEMPTS = 5
+
+
+def pending_events(kind="seller_accounting"):
+    return OrderOutbox.objects.filter(processed_at__isnull=True, kind=kind, attempts__lt=MAX_ATTEMPTS)
+
+
+def process_outbox(batch_size=200):
+    """Settle one batch of pending orders and return ``(processed, failed)``.
+
+    Sales records, seller wallet credits and sale remittances for every order
+    in the batch are written together through ``ledger.post_many``, which
+    applies each wallet's summed credits with one ``F()`` update. Events are
+    marked processed in the same transaction, so a crash never double-credits.
+    If the batch fails, its events are retried one by one and the failing ones
+    record the error.
+    """
+    with transaction.atomic():
+        events = list(
+            pending_events().select_for_update(skip_locked=True).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0, 0
+        processed, touched = _apply(events)
+        transaction.on_commit(lambda: _after_commit(touched))
+    return processed, len(events) - processed
+
+
+def _apply(events):
+    try:
+        with transaction.atomic():
+            return len(events), _settle(events)
+    except Exception as exc:
+        if len(events) == 1:
+            OrderOutbox.objects.filter(pk=events[0].pk).update(
+                attempts=F("attempts") + 1, last_error=f"{type(exc).__name__}: {exc}"
+            )
+            return 0, set()
+    processed, touched = 0, set()
+    for event in events:
+        done, items = _apply([event])
+        processed += done
+        touched |= items
+    return processed, touched
+
+
+def _settle(events):
+    details = list(
+        OrderDetails.objects.filter(order_id__in=[e.order_id for e in events])
+        .select_related("goods__shop", "goods__product")
+        .order_by("order_id", "id")
+    )
+    SalesRecord.objects.bulk_create([
+        SalesRecord(
+            shop=d.goods.shop,
+            order_detail=d,
+            product=d.goods.product,
+            quantity_sold=d.quantity,
+            unit_price=d.price / d.quantity,
+            total_revenue=d.price,
+            profit_margin=d.price - d.goods.purchase_price * d.quantity,
+        )
+        for d in details
+    ])
+
+    owner_ids = {d.goods.shop.owner_id for d in details}
+    wallets = dict(Wallet.objects.filter(user_id__in=owner_ids).values_list("user_id", "id"))
+    missing = owner_ids - set(wallets)
+    if missing:
+        Wallet.objects.bulk_create([Wallet(user_id=uid) for uid in missing])
+        wallets = dict(Wallet.objects.filter(user_id__in=owner_ids).values_list("user_id", "id"))
+
+    ledger.post_many([
+        ledger.Entry(
+            wallets[d.goods.shop.owner_id],
+            d.price,
+            "sale",
+            f"Sale of {d.goods.product.name} x{d.quantity} (Order #{d.order_id})",
+        )
+        for d in details
+    ])
+
+    OrderOutbox.objects.filter(pk__in=[e.pk for e in events]).update(
+        processed_at=timezone.now(), attempts=F("attempts") + 1, last_error=None
+    )
+    return {(d.goods.shop_id, d.goods.product_id) for d in details}
+
+
+def _after_commit(items):
+    # bulk_create skips the SalesRecord signals that keep pricing caches fresh.
+    # This only frees this process's entries; web processes notice the new
+    # sales through pricing_cache.inputs_marker.
+    from .pricing_cache import invalidate_item
+
+    for shop_id, product_id in items:
+        invalidate_item(shop_id, product_id)
@@ -0,0 +1,130 @@
+from bisect import bisect_left
+
+from .models import Goods, ProductPriceIndex
+
+
+def _quantile(prices, q):
+    """Linear-interpolated quantile of an already sorted list."""
+    if not prices:
+        return None
+    pos = (len(prices) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(prices) - 1)
+    return prices[lo] + (prices[hi] - prices[lo]) * (pos - lo)
+
+
+def summarize_prices(prices):
+    """Field values for a ProductPriceIndex row from a list of offer prices."""
+    prices = sorted(float(p) for p in prices if p and float(p) > 0)
+    return {
+        "offer_count": len(prices),
+        "min_price": prices[0] if prices else None,
+        "p25_price": _quantile(prices, 0.25),
+        "median_price": median_excluding(prices),
+        "p75_price": _quantile(prices, 0.75),
+        "max_price": prices[-1] if prices else None,
+        "prices": prices,
+    }
+
+
+def _available_prices(product_ids):
+    prices = {pid: [] for pid in product_ids}
+    for product_id, price in (
+        Goods.objects
+        .filter(product_id__in=product_ids, is_available=True, selling_price__gt=0)
+        .values_list("product_id", "selling_price")
+    ):
+        prices[product_id].append(price)
+    return prices
+
+
+def refresh_price_index(product_id, create=True):
+    """Recompute one product's price summary from its available offers.
+
+    With ``create=False`` only an existing row is updated, which is what the
+    delete signal needs while a product is being cascade-deleted.
+    """
+    fields = summarize_prices(_available_prices([product_id])[product_id])
+    if not create:
+        ProductPriceIndex.objects.filter(product_id=product_id).update(**fields)
+        return None
+    index, _ = ProductPriceIndex.objects.update_or_create(product_id=product_id, defaults=fields)
+    return index
+
+
+def rebuild_price_index(product_ids=None):
+    """Recompute the summaries of ``product_ids`` (default: every product with offers)."""
+    if product_ids is None:
+        product_ids = list(Goods.objects.values_list("product_id", flat=True).distinct().order_by())
+    product_ids = list(product_ids)
+    prices = _available_prices(product_ids)
+    existing = set(ProductPriceIndex.objects.filter(product_id__in=product_ids).values_list("product_id", flat=True))
+    to_update, to_create = [], []
+    for pid in product_ids:
+        index = ProductPriceIndex(product_id=pid, **summarize_prices(prices[pid]))
+        (to_update if pid in existing else to_create).append(index)
+    if to_update:
+        ids = dict(ProductPriceIndex.objects.filter(product_id__in=existing).values_list("product_id", "id"))
+        for index in to_update:
+            index.pk = ids[index.product_id]
+        ProductPriceIndex.objects.bulk_update(
+            to_update,
+            ["offer_count", "min_price", "p25_price", "median_price", "p75_price", "max_price", "prices"],
+            batch_size=500,
+        )
+    ProductPriceIndex.objects.bulk_create(to_create, batch_size=500)
+    return len(product_ids)
+
+
+def get_price_index(product):
+    """The product's summary, using a ``select_related`` cache when present."""
+    try:
+        return product.price_index
+    except ProductPriceIndex.DoesNotExist:
+        return refresh_price_index(product.pk)
+
+
+def median_excluding(prices, price=None):
+    """Median of the sorted ``prices`` with one occurrence of ``price`` left out.
+
+    O(log n): the excluded element is located by bisection and the median is
+    read from index arithmetic instead of building a new list.
+    """
+    n = len(prices)
+    skip = None
+    if price is not None:
+        i = bisect_left(prices, price)
+        if i < n and prices[i] == price:
+            skip = i
+    if skip is not None:
+        n -= 1
+    if n == 0:
+        return None
+
+    def at(k):
+        return prices[k] if skip is None or k < skip else prices[k + 1]
+
+    mid = n // 2
+    return at(mid) if n % 2 else (at(mid - 1) + at(mid)) / 2.0
+
+
+def competitor_median(goods, index=None):
+    """Median price of the other available offers for ``goods.product``, or None."""
+    index = index if index is not None else get_price_index(goods.product)
+    if index is None or not index.offer_count:
+        return None
+    own = float(goods.selling_price)
+    own = own if goods.is_available and own > 0 else None
+    return median_excluding(index.prices, own)
+
+
+def price_position(my_price, median_price):
+    """'pricier', 'cheaper' or 'equal' against a market median (3% band), 'unknown' without one."""
+    if median_price is None:
+        return 'unknown'
+    if my_price > median_price * 1.03:
+        return 'pricier'
+    elif my_price < median_price * 0.97:
+        return 'cheaper'
+    else:
+        return 'equal'
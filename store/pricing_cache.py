@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from .memory_cache import SizedLRUCache
+from .models import Goods, SalesRecord
+
+
+RECOMMENDATION_TTL_SECONDS = getattr(settings, "PRICING_RECOMMENDATION_TTL_SECONDS", 5 * 60)
+
+_RECOMMENDATIONS = SizedLRUCache(
+    max_bytes=getattr(settings, "PRICING_RECOMMENDATION_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+    ttl_seconds=RECOMMENDATION_TTL_SECONDS,
+    name="pricing_recommendations",
+)
+# (shop_id, product_id) -> goods ids with a cached recommendation, so SalesRecord
+# writes in this process can invalidate without a query. Writes made by other
+# processes (checkout in another web worker, process_outbox) are caught by the
+# inputs marker each entry is checked against.
+_goods_by_item = {}
+_items_lock = threading.Lock()
+
+
+def facts_fingerprint(facts, current_price, purchase_price, min_margin=None):
+    """Stable short hash of everything a recommendation is derived from."""
+    payload = json.dumps(
+        {"facts": facts, "current": current_price, "purchase": purchase_price, "min_margin": min_margin},
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def inputs_marker(goods_id):
+    """Latest sales record id, prices and stock of ``goods_id``, from one query.
+
+    Changes whenever a sale is settled or the goods row is repriced or
+    restocked, whichever process made the write.
+    """
+    last_sale = (
+        SalesRecord.objects.filter(shop_id=OuterRef("shop_id"), product_id=OuterRef("product_id"))
+        .order_by("-id")
+        .values("id")[:1]
+    )
+    return (
+        Goods.objects.filter(pk=goods_id)
+        .annotate(last_sale=Subquery(last_sale))
+        .values_list("last_sale", "selling_price", "purchase_price", "stock")
+        .first()
+    )
+
+
+def get_recommendation(goods, window_days=30, min_margin=None, context=None):
+    """Recommendation for ``goods``, served from cache while its inputs are unchanged.
+
+    Cached entries are only served while ``inputs_marker`` still matches, so
+    sales settled and prices changed by other processes are never missed. The
+    result carries a ``fingerprint`` of its facts and prices plus a ``cached``
+    flag.
+    """
+    marker = inputs_marker(goods.pk)
+    entry = _RECOMMENDATIONS.get(goods.pk)
+    if entry is not None and entry["params"] == (window_days, min_margin) and entry["marker"] == marker:
+        return dict(entry["recommendation"], cached=True)
+
+    from .EYAD_pricing_experta import recommend_for_goods
+    recommendation = recommend_for_goods(goods.pk, window_days=window_days, min_margin=min_margin, context=context)
+    recommendation["fingerprint"] = facts_fingerprint(
+        recommendation["facts"], recommendation["current_price"], recommendation["purchase_price"], min_margin
+    )
+    _RECOMMENDATIONS.set(
+        goods.pk, {"params": (window_days, min_margin), "marker": marker, "recommendation": recommendation}
+    )
+    with _items_lock:
+        _goods_by_item.setdefault((goods.shop_id, goods.product_id), set()).add(goods.pk)
+    return dict(recommendation, cached=False)
+
+
+def recommendation_for_fingerprint(goods, fingerprint, window_days=30, min_margin=None):
+    """The recommendation the seller was shown, or None if its inputs have changed since.
+
+    Goes through ``get_recommendation``, so a sale settled by another process
+    after the seller loaded the page changes the fingerprint and is rejected.
+    """
+    recommendation = get_recommendation(goods, window_days=window_days, min_margin=min_margin)
+    return recommendation if fingerprint and recommendation["fingerprint"] == fingerprint else None
+
+
+def invalidate_goods(goods_id):
+    _RECOMMENDATIONS.delete(goods_id)
+
+
+def invalidate_item(shop_id, product_id):
+    with _items_lock:
+        goods_ids = _goods_by_item.pop((shop_id, product_id), ())
+    for goods_id in goods_ids:
+        _RECOMMENDATIONS.delete(goods_id)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from experta import Rule
+
+from .EYAD_pricing_experta import (
+    PricingExpert, ProductFact, Recommendation,
+    MIN_MARGIN_DEFAULT, MAX_INCREASE_PCT, MAX_DECREASE_PCT,
+)
+
+
+FACT_FIELDS = ('sales', 'stock', 'competition', 'rating', 'favorites', 'margin', 'trend', 'age', 'season', 'elasticity')
+PROMOTION_ORDER = ('bundle', 'free_shipping', 'promotion')
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    name: str
+    conditions: Dict[str, str]
+    action: str
+    pct: float
+    reason: str
+
+
+class _Recorder:
+    def __init__(self):
+        self.decisions = []
+
+    def _push(self, action, pct, reason):
+        self.decisions.append((action, pct, reason))
+
+
+def compile_rules(engine_cls=PricingExpert) -> List[CompiledRule]:
+    """Translate the engine's ``@Rule(ProductFact(...))`` methods into plain data.
+
+    Only rules with a single ``ProductFact`` of literal values whose body makes
+    exactly one ``_push`` call can be compiled; anything else raises
+    ``ValueError`` so the table can never silently diverge from the engine.
+    """
+    compiled = []
+    for name, rule in vars(engine_cls).items():
+        if not isinstance(rule, Rule):
+            continue
+        patterns = list(rule)
+        if len(patterns) != 1 or not isinstance(patterns[0], ProductFact):
+            raise ValueError(f"Rule {name} is not a single ProductFact pattern")
+        conditions = dict(patterns[0])
+        if any(not isinstance(v, str) or k not in FACT_FIELDS for k, v in conditions.items()):
+            raise ValueError(f"Rule {name} matches on something other than literal fact labels")
+        recorder = _Recorder()
+        rule._wrapped(recorder)
+        if len(recorder.decisions) != 1:
+            raise ValueError(f"Rule {name} does not push exactly one decision")
+        action, pct, reason = recorder.decisions[0]
+        compiled.append(CompiledRule(name, conditions, action, float(pct), reason))
+    return compiled
+
+
+class DecisionTable:
+    """Evaluates compiled pricing rules for many goods at once.
+
+    Facts become one NumPy label array per field; each rule is a conjunction of
+    equality tests over those arrays, giving a goods x rules boolean matrix.
+    Percentages are then accumulated and the ``get_recommendation`` branches
+    applied as array operations.
+    """
+
+    def __init__(self, rules: Optional[Sequence[CompiledRule]] = None):
+        self.rules = list(rules if rules is not None else compile_rules())
+        self.actions = np.array([r.action for r in self.rules])
+        self.pcts = np.array([r.pct for r in self.rules], dtype=np.float64)
+        self.is_inc = self.actions == 'increase'
+        self.is_dec = self.actions == 'decrease'
+        self.is_keep = self.actions == 'keep'
+        self.is_prom = np.isin(self.actions, PROMOTION_ORDER)
+
+    def match(self, facts_list: Sequence[Dict[str, str]]) -> np.ndarray:
+        """Boolean (goods, rules) matrix of fired rules."""
+        n = len(facts_list)
+        labels = {f: np.array([facts.get(f, '') for facts in facts_list], dtype=object) for f in FACT_FIELDS}
+        fired = np.ones((n, len(self.rules)), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            for field, value in rule.conditions.items():
+                fired[:, j] &= labels[field] == value
+        return fired
+
+    def _sum_pct(self, fired, mask):
+        # Accumulate rule by rule, in rule order, so sums match Python's left-to-right sum().
+        total = np.zeros(fired.shape[0], dtype=np.float64)
+        for j in np.flatnonzero(mask):
+            total = total + np.where(fired[:, j], self.pcts[j], 0.0)
+        return total
+
+    def recommend(self, facts_list, current_prices, purchase_prices, min_margin: float) -> List[Recommendation]:
+        fired = self.match(facts_list)
+        current = np.asarray(current_prices, dtype=np.float64)
+        floor = np.asarray(purchase_prices, dtype=np.float64) * (1.0 + min_margin)
+
+        inc_pct = self._sum_pct(fired, self.is_inc)
+        dec_pct = self._sum_pct(fired, self.is_dec)
+        has_inc = fired[:, self.is_inc].any(axis=1)
+        has_dec = fired[:, self.is_dec].any(axis=1)
+        has_prom = fired[:, self.is_prom].any(axis=1)
+        has_keep = fired[:, self.is_keep].any(axis=1)
+        has_any = fired.any(axis=1)
+
+        go_up = has_inc & (~has_dec | (inc_pct > dec_pct))
+        go_down = has_dec & ~go_up
+        with np.errstate(divide='ignore', invalid='ignore'):
+            up_price = np.maximum(current * (1.0 + np.minimum(inc_pct, MAX_INCREASE_PCT)), floor)
+            down_price = np.maximum(current * (1.0 - np.minimum(dec_pct, MAX_DECREASE_PCT)), floor)
+        blocked = go_down & (down_price >= current)
+
+        reasons_of = [r.reason for r in self.rules]
+        results = []
+        for i in range(fired.shape[0]):
+            row = fired[i]
+            if go_up[i]:
+                price = round(float(up_price[i]), 2)
+                results.append(Recommendation('increase', price / float(current[i]) - 1.0, self._reasons(row, self.is_inc, reasons_of), price))
+            elif blocked[i]:
+                results.append(Recommendation(
+                    'keep', 0.0,
+                    ["Decrease blocked by minimum margin floor"] + self._reasons(row, self.is_dec, reasons_of),
+                    round(float(current[i]), 2),
+                ))
+            elif go_down[i]:
+                price = round(float(down_price[i]), 2)
+                results.append(Recommendation('decrease', price / float(current[i]) - 1.0, self._reasons(row, self.is_dec, reasons_of), price))
+            elif has_prom[i]:
+                prom = [j for j in np.flatnonzero(row & self.is_prom)]
+                prom.sort(key=lambda j: PROMOTION_ORDER.index(self.actions[j]))
+                results.append(Recommendation(str(self.actions[prom[0]]), 0.0, [reasons_of[j] for j in prom], None))
+            elif not has_any[i]:
+                results.append(Recommendation(action='keep', pct=0.0, reasons=["No effective rules fired"]))
+            else:
+                keep = self._reasons(row, self.is_keep, reasons_of) if has_keep[i] else ["Price stability"]
+                results.append(Recommendation('keep', 0.0, keep))
+        return results
+
+    @staticmethod
+    def _reasons(row, mask, reasons_of):
+        return [reasons_of[j] for j in np.flatnonzero(row & mask)]
+
+
+_table: Optional[DecisionTable] = None
+
+
+def get_decision_table() -> DecisionTable:
+    global _table
+    if _table is None:
+        _table = DecisionTable()
+    return _table
+
+
+def recommend_batch(goods_list, facts_list, min_margin: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Table-evaluated equivalent of calling ``recommend_from_facts`` for each goods."""
+    min_margin = MIN_MARGIN_DEFAULT if min_margin is None else float(min_margin)
+    current = [float(g.selling_price) for g in goods_list]
+    purchase = [float(g.purchase_price) for g in goods_list]
+    recs = get_decision_table().recommend(facts_list, current, purchase, min_margin)
+    results = []
+    for rec, facts, cur, pur in zip(recs, facts_list, current, purchase):
+        result = rec.to_dict()
+        result['facts'] = facts
+        result['current_price'] = cur
+        result['purchase_price'] = pur
+        results.append(result)
+    return results
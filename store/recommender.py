@@ -1,3 +1,5 @@
+import threading
+
 import pandas as pd
 from sklearn.decomposition import TruncatedSVD
 from sklearn.neighbors import NearestNeighbors
@@ -25,37 +27,57 @@ def load_data():
 
     return df
 
-df = load_data()
-
-user_category_matrix = df.pivot_table(
-    index='user_id',
-    columns='category_id',
-    aggfunc='size',
-    fill_value=0
-)
+df = user_category_matrix = svd = user_embeddings = kmeans = clusters = user_cluster_df = None
+_model_lock = threading.Lock()
+
+
+def _ensure_model():
+    """Fit the user clusters on first use rather than at import, so importing
+    the module (URL checks, migrations, tests) never touches the database."""
+    global df, user_category_matrix, svd, user_embeddings, kmeans, clusters, user_cluster_df
+    if user_cluster_df is not None:
+        return
+    with _model_lock:
+        if user_cluster_df is not None:
+            return
+        data = load_data()
+
+        matrix = data.pivot_table(
+            index='user_id',
+            columns='category_id',
+            aggfunc='size',
+            fill_value=0
+        )
 
-svd = TruncatedSVD(n_components=15, random_state=1)
-user_embeddings = svd.fit_transform(user_category_matrix)
+        model_svd = TruncatedSVD(n_components=15, random_state=1)
+        embeddings = model_svd.fit_transform(matrix)
 
-kmeans = KMeans(n_clusters=15, random_state=1)
-clusters = kmeans.fit_predict(user_embeddings)
+        model_kmeans = KMeans(n_clusters=15, random_state=1)
+        labels = model_kmeans.fit_predict(embeddings)
 
-user_cluster_df = pd.DataFrame({
-    'user_id': user_category_matrix.index,
-    'cluster_id': clusters
-})
+        df, user_category_matrix, svd, user_embeddings, kmeans, clusters = (
+            data, matrix, model_svd, embeddings, model_kmeans, labels
+        )
+        user_cluster_df = pd.DataFrame({
+            'user_id': matrix.index,
+            'cluster_id': labels
+        })
 
 def get_user_vector(user_id):
+    _ensure_model()
     idx = user_category_matrix.index.get_loc(user_id)
     return user_embeddings[idx], idx
 
 def get_user_products(user_id):
+    _ensure_model()
     return df[df['user_id'] == user_id]['product_id']
 
 def get_user_categories(user_id):
+    _ensure_model()
     return set(df[df['user_id'] == user_id]['category_id'])
 
 def get_product_category(product_id):
+    _ensure_model()
     row = df[df['product_id'] == product_id]
     return row['category_id'].values[0] if not row.empty else None
 
@@ -91,6 +113,7 @@ def get_fallback_recommendations(top_n=3):
 
 
 def recommend_from_shared_category(target_user_id, top_n=4):
+    _ensure_model()
     try:
         cluster_id = user_cluster_df.set_index("user_id").loc[target_user_id]["cluster_id"]
     except KeyError:
@@ -132,6 +155,7 @@ def recommend_from_shared_category(target_user_id, top_n=4):
 
 
 def recommend_from_new_category(target_user_id, top_n=4):
+    _ensure_model()
     try:
         cluster_id = user_cluster_df.set_index("user_id").loc[target_user_id]["cluster_id"]
     except KeyError:
@@ -174,6 +198,7 @@ def recommend_from_new_category(target_user_id, top_n=4):
 
 
 def get_cluster_stats(target_user_id=None):
+    _ensure_model()
     try:
         cluster_counts = (
             user_cluster_df["cluster_id"]
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Goods, StockReservation
+
+
+RESERVATION_TTL_SECONDS = getattr(settings, "STOCK_RESERVATION_TTL_SECONDS", 15 * 60)
+
+
+class ReservationError(Exception):
+    def __init__(self, goods, available):
+        self.goods = goods
+        self.available = max(available, 0)
+        super().__init__(f"Only {self.available} units available.")
+
+
+def _active(now=None):
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def held_quantities(goods_ids, exclude_user=None, now=None):
+    """``{goods_id: units}`` held by unexpired reservations, optionally ignoring one user's."""
+    holds = _active(now).filter(goods_id__in=goods_ids)
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    return dict(holds.values("goods_id").annotate(units=Sum("quantity")).values_list("goods_id", "units").order_by())
+
+
+def with_available_to_sell(queryset, user=None, now=None):
+    """Annotate Goods with ``held_quantity`` and ``available_to_sell`` (stock minus other buyers' holds)."""
+    holds = _active(now).filter(goods=OuterRef("pk"))
+    if user is not None:
+        holds = holds.exclude(user=user)
+    held = holds.values("goods").annotate(units=Sum("quantity")).values("units").order_by()
+    return queryset.annotate(
+        held_quantity=Coalesce(Subquery(held, output_field=models.IntegerField()), 0),
+        available_to_sell=ExpressionWrapper(F("stock") - F("held_quantity"), output_field=models.IntegerField()),
+    )
+
+
+def available_to_sell(goods, user=None):
+    return goods.stock - held_quantities([goods.pk], exclude_user=user).get(goods.pk, 0)
+
+
+def reserve(user, goods, quantity):
+    """Hold ``quantity`` units of ``goods`` for ``user``, replacing any earlier hold.
+
+    The Goods row is locked only for the duration of the check, so concurrent
+    holds cannot together exceed stock. Raises ``ReservationError`` if fewer
+    than ``quantity`` units are free.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        stock = Goods.objects.select_for_update().filter(pk=goods.pk).values_list("stock", flat=True).first() or 0
+        available = stock - held_quantities([goods.pk], exclude_user=user, now=now).get(goods.pk, 0)
+        if quantity > available:
+            raise ReservationError(goods, available)
+        StockReservation.objects.update_or_create(
+            goods_id=goods.pk,
+            user=user,
+            defaults={"quantity": quantity, "expires_at": now + timedelta(seconds=RESERVATION_TTL_SECONDS)},
+        )
+
+
+def release(user, goods_ids=None):
+    holds = StockReservation.objects.filter(user=user)
+    if goods_ids is not None:
+        holds = holds.filter(goods_id__in=goods_ids)
+    return holds.delete()[0]
+
+
+def extend(user):
+    """Restart the TTL of ``user``'s unexpired holds, e.g. while they are checking out."""
+    now = timezone.now()
+    return _active(now).filter(user=user).update(expires_at=now + timedelta(seconds=RESERVATION_TTL_SECONDS))
+
+
+def sweep_expired(now=None):
+    """Delete expired holds and return how many were removed."""
+    return StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
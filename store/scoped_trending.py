@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .memory_cache import SizedLRUCache
+from .models import OrderDetails, Product, SalesRecord
+
+
+TRENDING_PERIOD_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+    "season": 90,
+}
+
+TRENDING_TOP_K = 8
+
+_TRENDING_CACHE = SizedLRUCache(
+    max_bytes=getattr(settings, "TRENDING_CACHE_MAX_BYTES", 4 * 1024 * 1024),
+    ttl_seconds=15 * 60,
+    name="scoped_trending",
+)
+
+
+def _image_url(name):
+    if not name:
+        return None
+    try:
+        return Product._meta.get_field("image").storage.url(name)
+    except Exception:
+        return None
+
+
+def _top_k(totals, top_k):
+    ranked = sorted(totals.values(), key=lambda r: (-r["sold"], r["id"]))
+    return ranked[:top_k]
+
+
+def build_scoped_trending(period="week", top_k=TRENDING_TOP_K):
+    """Aggregate sales once and build top-k lists for every category and shop.
+
+    One grouped query over OrderDetails yields units sold per (shop, product)
+    and a second over SalesRecord yields revenue for the same keys; they are
+    merged in memory so the revenue join cannot multiply the quantities.
+    Per-category and per-shop rankings are then folded from the merged rows.
+    """
+    days = TRENDING_PERIOD_DAYS.get(period, TRENDING_PERIOD_DAYS["week"])
+    cutoff = timezone.now() - timedelta(days=days)
+    rows = (
+        OrderDetails.objects
+        .filter(order__order_date__gte=cutoff)
+        .values(
+            "goods__shop_id",
+            "goods__product_id",
+            "goods__product__name",
+            "goods__product__image",
+            "goods__product__category_id",
+            "goods__product__category__name",
+        )
+        .annotate(total_sold=Sum("quantity"))
+        .order_by()
+    )
+    revenue_by_item = {
+        (shop_id, product_id): revenue
+        for shop_id, product_id, revenue in (
+            SalesRecord.objects
+            .filter(order_detail__order__order_date__gte=cutoff)
+            .values_list("order_detail__goods__shop_id", "order_detail__goods__product_id")
+            .annotate(total_revenue=Sum("total_revenue"))
+            .order_by()
+        )
+    }
+
+    by_category = defaultdict(dict)
+    by_shop = defaultdict(dict)
+    for row in rows:
+        pid = row["goods__product_id"]
+        sold = int(row["total_sold"] or 0)
+        revenue = float(revenue_by_item.get((row["goods__shop_id"], pid)) or 0)
+        base = {
+            "id": pid,
+            "name": row["goods__product__name"],
+            "category": row["goods__product__category__name"] or "Unknown",
+            "image": _image_url(row["goods__product__image"]),
+        }
+        for bucket in (by_category[row["goods__product__category_id"]], by_shop[row["goods__shop_id"]]):
+            entry = bucket.get(pid)
+            if entry is None:
+                bucket[pid] = dict(base, sold=sold, revenue=revenue)
+            else:
+                entry["sold"] += sold
+                entry["revenue"] += revenue
+
+    return {
+        "category": {cid: _top_k(totals, top_k) for cid, totals in by_category.items()},
+        "shop": {sid: _top_k(totals, top_k) for sid, totals in by_shop.items()},
+    }
+
+
+def normalize_period(period):
+    """``period`` if it is a known trending window, else the default ``"week"``."""
+    return period if period in TRENDING_PERIOD_DAYS else "week"
+
+
+def get_scoped_trending(scope, scope_id, period="week"):
+    period = normalize_period(period)
+    # Single-flight: concurrent misses for a period share one build.
+    snapshot = _TRENDING_CACHE.get_or_compute(period, lambda: build_scoped_trending(period))
+    return snapshot[scope].get(scope_id, [])
+
+
+def get_category_trending(category_id, period="week"):
+    return get_scoped_trending("category", category_id, period)
+
+
+def get_shop_trending(shop_id, period="week"):
+    return get_scoped_trending("shop", shop_id, period)
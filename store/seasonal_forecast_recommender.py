@@ -1,12 +1,12 @@
 import pandas as pd
 import numpy as np
+from array import array
 from datetime import timedelta
-from collections import Counter, defaultdict
-import os
-import pickle
-import time
+from collections import defaultdict
+import hashlib
 
-from django.db.models import Sum
+from django.db.models import Sum, F, Window
+from django.db.models.functions import TruncDate, RowNumber
 from django.conf import settings
 from django.utils import timezone
 try:
@@ -14,30 +14,25 @@ try:
 except Exception:
     CATEGORY_SIMILARITY_MAP = {}
 
-from .models import OrderDetails, OrderMaster, Product, Goods, Category
+from .models import OrderDetails, Product, Goods, ForecastScore
+from . import batch_forecaster
+from .category_catalogue import get_category_catalogue
+from .copurchase import copurchased_by_query, get_copurchase_matrix
+from .memory_cache import SizedLRUCache, estimate_size
 
 try:
     from prophet import Prophet
+    from prophet.serialize import model_to_json, model_from_json
     PROPHET_AVAILABLE = True
 except Exception:
     PROPHET_AVAILABLE = False
 
-_CACHE = {}
 _CACHE_TTL_SECONDS = 60 * 60
-
-def _cache_get(key):
-    entry = _CACHE.get(key)
-    if not entry:
-        return None
-    ts, value = entry
-    if (time.time() - ts) > _CACHE_TTL_SECONDS:
-        del _CACHE[key]
-        return None
-    return value
-
-
-def _cache_set(key, value):
-    _CACHE[key] = (time.time(), value)
+_CACHE = SizedLRUCache(
+    max_bytes=getattr(settings, "SEASONAL_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+    ttl_seconds=_CACHE_TTL_SECONDS,
+    name="seasonal_data",
+)
 
 
 CATEGORY_SEASON_MAP = {
@@ -96,6 +91,7 @@ SEASONAL_CONFIG = {
     "fallback_top_limit": 20,
     "fallback_days_back": 120,
     "recency_days": 90,
+    "forecast_backend": "auto",
     "source_bonus": {
         "copurchase": 3.0,
         "user_top_category": 2.0,
@@ -139,39 +135,52 @@ def get_current_season(date=None):
         return "autumn"
 
 
-def load_sales_dataframe(product_ids=None, days_back=365 * 2):
-    cache_key = f"sales_df_{days_back}_{','.join(map(str, product_ids)) if product_ids else 'all'}"
-    cached = _cache_get(cache_key)
-    if cached is not None:
-        return cached.copy()
+def _sales_cache_key(prefix, product_ids, days_back):
+    if product_ids:
+        ids = ",".join(map(str, sorted(set(int(p) for p in product_ids))))
+        digest = hashlib.sha1(ids.encode("ascii")).hexdigest()[:16]
+    else:
+        digest = "all"
+    return f"{prefix}_{days_back}_{digest}"
+
+
+def load_daily_sales_arrays(product_ids=None, days_back=365 * 2):
+    """Daily quantity per product as typed arrays ``(product_id, day_ordinal, qty)``.
+
+    Bucketing by day and summing happen in SQL; rows are streamed straight into
+    int32/int32/float32 buffers without building per-row Python dicts.
+    """
+    cache_key = _sales_cache_key("sales_arrays", product_ids, days_back)
+    return _CACHE.get_or_compute(cache_key, lambda: _query_daily_sales_arrays(product_ids, days_back))
 
+
+def _query_daily_sales_arrays(product_ids, days_back):
     cutoff = timezone.now() - timedelta(days=days_back)
+    qs = OrderDetails.objects.filter(order__order_date__gte=cutoff)
+    if product_ids:
+        qs = qs.filter(goods__product_id__in=list(product_ids))
     qs = (
-        OrderDetails.objects
-        .select_related("order", "goods__product")
-        .filter(order__order_date__gte=cutoff)
-        .values("order__order_date", "goods__product_id", "quantity")
+        qs.annotate(day=TruncDate("order__order_date"))
+        .values_list("goods__product_id", "day")
+        .annotate(qty=Sum("quantity"))
+        .order_by()
     )
 
-    rows = []
-    for r in qs:
-        try:
-            ds = r["order__order_date"].date()
-            pid = r["goods__product_id"]
-            qty = r["quantity"] or 0
-            rows.append({"ds": pd.to_datetime(ds), "product_id": pid, "y": qty})
-        except Exception:
+    pid_buf = array("i")
+    day_buf = array("i")
+    qty_buf = array("f")
+    for pid, day, qty in qs.iterator(chunk_size=5000):
+        if pid is None or day is None:
             continue
-
-    if not rows:
-        df_daily = pd.DataFrame(columns=["ds", "product_id", "y"])
-        _cache_set(cache_key, df_daily)
-        return df_daily
-
-    df = pd.DataFrame(rows)
-    df_daily = df.groupby(["ds", "product_id"], as_index=False).agg({"y": "sum"})
-    _cache_set(cache_key, df_daily)
-    return df_daily
+        pid_buf.append(pid)
+        day_buf.append(day.toordinal())
+        qty_buf.append(qty or 0)
+
+    return (
+        np.frombuffer(pid_buf, dtype=np.int32),
+        np.frombuffer(day_buf, dtype=np.int32),
+        np.frombuffer(qty_buf, dtype=np.float32),
+    )
 
 
 def top_selling_products(limit=30, days_back=365):
@@ -187,44 +196,84 @@ def top_selling_products(limit=30, days_back=365):
     return [item["goods__product_id"] for item in qs if item["goods__product_id"]]
 
 
-_PROPHEST_MODEL_CACHE = {}
+# Fixed per-model allowance for the fitted state besides history and params.
+PROPHET_MODEL_OVERHEAD_BYTES = 32 * 1024
+
+
+def prophet_model_size(model):
+    """Cache size of a fitted Prophet model, from its history frame and parameter arrays.
+
+    Measuring these directly avoids ``estimate_size`` pickling the whole model.
+    """
+    if model is None:
+        return 0
+    size = PROPHET_MODEL_OVERHEAD_BYTES + estimate_size(getattr(model, "history", None))
+    return size + sum(estimate_size(v) for v in (getattr(model, "params", None) or {}).values())
+
+
+_PROPHEST_MODEL_CACHE = SizedLRUCache(
+    max_bytes=getattr(settings, "PROPHET_MODEL_CACHE_MAX_BYTES", 128 * 1024 * 1024),
+    ttl_seconds=60 * 60,
+    sizeof=prophet_model_size,
+    name="prophet_models",
+)
+
+PROPHET_PARAMS = {
+    "changepoint_prior_scale": 0.05,
+    "yearly_seasonality": True,
+    "weekly_seasonality": True,
+    "daily_seasonality": False,
+}
+MIN_HISTORY_DAYS = 30
+
+
+def new_prophet_model():
+    return Prophet(**PROPHET_PARAMS)
 
 
 def _train_prophet_for_product(df_product, product_id):
     if not PROPHET_AVAILABLE:
         return None
 
-    cached = _PROPHEST_MODEL_CACHE.get(product_id)
-    if cached and (time.time() - cached[1] < 3600):
-        return cached[0]
+    if len(df_product) < MIN_HISTORY_DAYS:
+        return None
 
-    try:
-        m = Prophet(changepoint_prior_scale=0.05, yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-        if len(df_product) < 30:
+    def fit():
+        try:
+            m = new_prophet_model()
+            m.fit(df_product)
+            return m
+        except Exception:
             return None
-        m.fit(df_product)
-        _PROPHEST_MODEL_CACHE[product_id] = (m, time.time())
-        return m
-    except Exception:
-        return None
+
+    return _PROPHEST_MODEL_CACHE.get_or_compute(product_id, fit)
 
 
-def forecast_growth_score_for_product(product_id, horizon_days=30, recent_window=30):
+def load_forecast_model(product_id, horizon_days=30):
+    """Rebuild a Prophet model persisted by the ``train_forecasts`` command."""
     if not PROPHET_AVAILABLE:
         return None
 
-    df_all = load_sales_dataframe(days_back=365 * 2)
-    df_p = df_all[df_all["product_id"] == product_id][["ds", "y"]].sort_values("ds")
-    if df_p.empty or len(df_p) < 30:
-        return None
+    def load():
+        row = (
+            ForecastScore.objects
+            .filter(product_id=product_id, horizon_days=horizon_days, backend="prophet")
+            .exclude(model_json__isnull=True)
+            .values_list("model_json", flat=True)
+            .first()
+        )
+        if not row:
+            return None
+        try:
+            return model_from_json(row)
+        except Exception:
+            return None
 
-    df_p_daily = df_p.set_index("ds").resample("D").sum().fillna(0).reset_index()
-    df_p_daily.columns = ["ds", "y"]
+    # Keyed apart from models fitted in-process, which are cached by bare product id.
+    return _PROPHEST_MODEL_CACHE.get_or_compute(("persisted", product_id, horizon_days), load)
 
-    m = _train_prophet_for_product(df_p_daily, product_id)
-    if not m:
-        return None
 
+def _growth_from_model(m, df_p_daily, horizon_days=30, recent_window=30):
     future = m.make_future_dataframe(periods=horizon_days, freq="D")
     try:
         fcst = m.predict(future)
@@ -239,7 +288,142 @@ def forecast_growth_score_for_product(product_id, horizon_days=30, recent_window
 
     eps = 1e-6
     score = (forecast_mean - recent_mean) / (recent_mean + eps)
-    return float(score)
+    return float(score), float(recent_mean), forecast_mean
+
+
+def fit_forecast_for_series(product_id, ds, y, horizon_days=30, recent_window=30):
+    """Fit one product's model; safe to run in a worker process (no DB access).
+
+    Returns ``(product_id, score, recent_mean, forecast_mean, model_json)`` or
+    ``None`` when the series is too short or Prophet fails.
+    """
+    if not PROPHET_AVAILABLE or len(y) < MIN_HISTORY_DAYS:
+        return None
+    df_p_daily = pd.DataFrame({"ds": ds, "y": y}, copy=False)
+    try:
+        m = new_prophet_model()
+        m.fit(df_p_daily)
+    except Exception:
+        return None
+    growth = _growth_from_model(m, df_p_daily, horizon_days=horizon_days, recent_window=recent_window)
+    if growth is None:
+        return None
+    score, recent_mean, forecast_mean = growth
+    return product_id, score, recent_mean, forecast_mean, model_to_json(m)
+
+
+FORECAST_BACKENDS = ("prophet", "seasonal_naive")
+
+
+def resolve_forecast_backend(backend=None):
+    backend = backend or SEASONAL_CONFIG.get("forecast_backend", "auto")
+    if backend == "auto":
+        return "prophet" if PROPHET_AVAILABLE else "seasonal_naive"
+    if backend not in FORECAST_BACKENDS:
+        raise ValueError(f"Unknown forecast backend: {backend}")
+    return backend
+
+
+def daily_sales_matrix(days_back=365 * 2):
+    """``(product_ids, start_ordinal, matrix)`` with one float32 row of daily sales per product."""
+    def build():
+        pids, days, qty = load_daily_sales_arrays(days_back=days_back)
+        return batch_forecaster.build_sales_matrix(pids, days, qty)
+
+    return _CACHE.get_or_compute(f"sales_matrix_{days_back}", build)
+
+
+def _sales_spans(days_back=365 * 2):
+    def build():
+        return batch_forecaster.sales_spans(daily_sales_matrix(days_back=days_back)[2])
+
+    return _CACHE.get_or_compute(f"sales_spans_{days_back}", build)
+
+
+def sales_series_by_product(product_ids, days_back=365 * 2):
+    """``{product_id: (ds, y)}`` for products with enough history.
+
+    Each series runs from the product's first to last day with sales. ``y`` is a
+    view into the shared sales matrix and ``ds`` a view into one shared date
+    index, so nothing is filtered, resampled or copied per product.
+    """
+    row_ids, start, matrix = daily_sales_matrix(days_back=days_back)
+    first, stop, days_sold = _sales_spans(days_back)
+    dates = batch_forecaster.ordinals_to_dates(np.arange(matrix.shape[1]) + start).astype("datetime64[ns]")
+    series = {}
+    for pid, row in zip(product_ids, batch_forecaster.row_positions(row_ids, product_ids)):
+        if row < 0 or days_sold[row] < MIN_HISTORY_DAYS:
+            continue
+        lo, hi = first[row], stop[row]
+        series[int(pid)] = (dates[lo:hi], matrix[row, lo:hi])
+    return series
+
+
+def batch_growth_scores(horizon_days=30, recent_window=30, days_back=365 * 2):
+    """Seasonal-naive growth score for every product with enough history, in one pass."""
+    def score():
+        row_ids, _, matrix = daily_sales_matrix(days_back=days_back)
+        scores = batch_forecaster.growth_scores(
+            matrix, horizon_days=horizon_days, recent_window=recent_window, min_history_days=MIN_HISTORY_DAYS
+        )
+        return {int(pid): float(score) for pid, score in zip(row_ids, scores) if not np.isnan(score)}
+
+    return _CACHE.get_or_compute(f"batch_scores_{horizon_days}_{recent_window}_{days_back}", score)
+
+
+def forecast_growth_score_for_product(product_id, horizon_days=30, recent_window=30, backend=None):
+    backend = resolve_forecast_backend(backend)
+    if backend == "seasonal_naive":
+        return batch_growth_scores(horizon_days=horizon_days, recent_window=recent_window).get(product_id)
+    if not PROPHET_AVAILABLE:
+        return None
+
+    series = sales_series_by_product([product_id]).get(product_id)
+    if series is None:
+        return None
+
+    df_p_daily = pd.DataFrame({"ds": series[0], "y": series[1]}, copy=False)
+    m = load_forecast_model(product_id, horizon_days) or _train_prophet_for_product(df_p_daily, product_id)
+    if not m:
+        return None
+
+    growth = _growth_from_model(m, df_p_daily, horizon_days=horizon_days, recent_window=recent_window)
+    return growth[0] if growth else None
+
+
+def _available_goods_by_category(category_ids, per_category):
+    """First ``per_category`` in-stock goods of every category, from one windowed query."""
+    category_ids = list(set(category_ids))
+    if not category_ids:
+        return {}
+    qs = (
+        Goods.objects
+        .filter(product__category_id__in=category_ids, is_available=True, stock__gt=0)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F("product__category_id"),
+            order_by=[F("product_id").asc(), F("id").asc()],
+        ))
+        .filter(rank__lte=per_category)
+        .order_by("product__category_id", "product_id", "id")
+        .values_list("product__category_id", "product_id", "product__name", "selling_price")
+    )
+    out = defaultdict(list)
+    for cid, pid, name, price in qs:
+        out[cid].append((pid, name, float(price if price else 0.0)))
+    return out
+
+
+def _first_goods_by_product(product_ids, available_only=False):
+    """``{product_id: (name, price)}`` using each product's lowest-id goods row."""
+    qs = Goods.objects.filter(product_id__in=list(product_ids))
+    if available_only:
+        qs = qs.filter(is_available=True, stock__gt=0)
+    out = {}
+    for pid, name, price in qs.order_by("product_id", "id").values_list("product_id", "product__name", "selling_price"):
+        if pid not in out:
+            out[pid] = (name, float(price if price else 0.0))
+    return out
 
 
 def rules_based_recommendations_for_user(user_id, top_n=6):
@@ -248,59 +432,46 @@ def rules_based_recommendations_for_user(user_id, top_n=6):
 
     user_top_categories = _top_categories(days_back=180, user_id=user_id, limit=8)
     user_categories = [cid for cid, _ in user_top_categories]
+    max_similar = SEASONAL_CONFIG.get('max_similar_cats', 5)
+
+    catalogue = get_category_catalogue()
+    similar_by_cat = {}
+    if CATEGORY_SIMILARITY_MAP:
+        similar_by_cat = {cid: catalogue.similar_category_ids(cid, max_similar) for cid in user_categories}
+    season_cat_ids = catalogue.season_category_ids(season)
+
+    per_category = max(
+        SEASONAL_CONFIG.get('pull_user_season', 16),
+        SEASONAL_CONFIG.get('pull_user_top', 16),
+        SEASONAL_CONFIG.get('pull_similar_per_cat', 12),
+        12,
+    )
+    goods_by_cat = _available_goods_by_category(
+        list(user_categories) + [cid for ids in similar_by_cat.values() for cid in ids] + list(season_cat_ids),
+        per_category,
+    )
+
+    def pull(cid, limit, source):
+        for pid, name, price in goods_by_cat.get(cid, [])[:limit]:
+            candidates.append((pid, name, price, source))
 
     candidates = []
     for cid in user_categories:
-        try:
-            cat = Category.objects.get(id=cid)
-        except Category.DoesNotExist:
-            continue
-        cat_name = (cat.name or "").lower()
-        seasons = CATEGORY_SEASON_MAP.get(cat_name, [])
-        if season in seasons:
-            goods_qs = Goods.objects.filter(product__category=cat, is_available=True, stock__gt=0)[: SEASONAL_CONFIG.get('pull_user_season', 16) ]
-            for g in goods_qs:
-                candidates.append((g.product.id, g.product.name, float(g.selling_price if g.selling_price else 0.0), "rule"))
+        if catalogue.in_season(cid, season):
+            pull(cid, SEASONAL_CONFIG.get('pull_user_season', 16), "rule")
 
     if len(candidates) < top_n and user_top_categories:
-        for cid, cname in user_top_categories:
-            try:
-                cat = Category.objects.get(id=cid)
-            except Category.DoesNotExist:
-                continue
-            goods_qs = Goods.objects.filter(product__category=cat, is_available=True, stock__gt=0)[: SEASONAL_CONFIG.get('pull_user_top', 16) ]
-            for g in goods_qs:
-                candidates.append((g.product.id, g.product.name, float(g.selling_price if g.selling_price else 0.0), "user_top_category"))
-
+        for cid in user_categories:
+            pull(cid, SEASONAL_CONFIG.get('pull_user_top', 16), "user_top_category")
 
     if len(candidates) < top_n and user_top_categories and CATEGORY_SIMILARITY_MAP:
-        for cid, cname in user_top_categories:
-            try:
-                base_cat = Category.objects.get(id=cid)
-            except Category.DoesNotExist:
-                continue
-            similar_names = CATEGORY_SIMILARITY_MAP.get(base_cat.name, []) or CATEGORY_SIMILARITY_MAP.get((base_cat.name or "").title(), [])
-            for sim_name in similar_names[: SEASONAL_CONFIG.get('max_similar_cats', 5) ]:
-                sim_cat = Category.objects.filter(name__iexact=sim_name).first()
-                if not sim_cat:
-                    continue
-                goods_qs = Goods.objects.filter(product__category=sim_cat, is_available=True, stock__gt=0)[: SEASONAL_CONFIG.get('pull_similar_per_cat', 12) ]
-                for g in goods_qs:
-                    candidates.append((g.product.id, g.product.name, float(g.selling_price if g.selling_price else 0.0), "similar_category"))
+        for cid in user_categories:
+            for sim_cid in similar_by_cat.get(cid, []):
+                pull(sim_cid, SEASONAL_CONFIG.get('pull_similar_per_cat', 12), "similar_category")
 
     if len(candidates) < top_n:
-        for cat_name, seasons in CATEGORY_SEASON_MAP.items():
-            if season in seasons:
-                try:
-                    cat = Category.objects.filter(name__iexact=cat_name).first()
-                    if not cat:
-                        continue
-                    goods_qs = Goods.objects.filter(product__category=cat, is_available=True, stock__gt=0)[:12]
-                    for g in goods_qs:
-                        candidates.append((g.product.id, g.product.name, float(g.selling_price if g.selling_price else 0.0), "rule"))
-                except Exception:
-                    continue
-
+        for cid in season_cat_ids:
+            pull(cid, 12, "rule")
 
     if len(candidates) < top_n:
         cutoff = now - timedelta(days=SEASONAL_CONFIG.get("copurchase_days", 180))
@@ -310,51 +481,33 @@ def rules_based_recommendations_for_user(user_id, top_n=6):
             .values_list('goods__product_id', flat=True)
         )
         if user_pids:
-            related_order_ids = list(
-                OrderDetails.objects
-                .filter(order__order_date__gte=cutoff, goods__product_id__in=user_pids)
-                .values_list('order_id', flat=True)
-                .distinct()
-            )
-            if related_order_ids:
-                others = (
-                    OrderDetails.objects
-                    .filter(order_id__in=related_order_ids)
-                    .exclude(goods__product_id__in=user_pids)
-                    .values('goods__product_id')
-                    .annotate(total=Sum('quantity'))
-                    .order_by('-total')
-                )
-                for r in others[: SEASONAL_CONFIG.get("copurchase_limit", 60) ]:
-                    pid = r['goods__product_id']
-                    try:
-                        prod = Product.objects.get(id=pid)
-                        goods = Goods.objects.filter(product=prod, is_available=True, stock__gt=0).first()
-                        if goods:
-                            candidates.append((prod.id, prod.name, float(goods.selling_price), "copurchase"))
-                    except Exception:
-                        continue
+            limit = SEASONAL_CONFIG.get("copurchase_limit", 60)
+            matrix = get_copurchase_matrix(SEASONAL_CONFIG.get("copurchase_days", 180))
+            if matrix is not None:
+                copurchased = matrix.copurchased_with(user_pids, limit=limit)
+            else:
+                copurchased = copurchased_by_query(user_pids, cutoff, limit=limit)
+            co_pids = [pid for pid, _ in copurchased]
+            first_goods = _first_goods_by_product(co_pids, available_only=True)
+            for pid in co_pids:
+                if pid in first_goods:
+                    name, price = first_goods[pid]
+                    candidates.append((pid, name, price, "copurchase"))
 
     if len(candidates) < top_n:
         site_top_cats = _top_categories(days_back=180, user_id=None, limit=SEASONAL_CONFIG.get("site_top_cats_limit", 10))
+        site_goods = _available_goods_by_category([cid for cid, _ in site_top_cats], SEASONAL_CONFIG.get("site_pull_per_cat", 12))
         for cid, _ in site_top_cats:
-            try:
-                cat = Category.objects.get(id=cid)
-            except Category.DoesNotExist:
-                continue
-            goods_qs = Goods.objects.filter(product__category=cat, is_available=True, stock__gt=0)[: SEASONAL_CONFIG.get("site_pull_per_cat", 12) ]
-            for g in goods_qs:
-                candidates.append((g.product.id, g.product.name, float(g.selling_price if g.selling_price else 0.0), "site_top_category"))
+            for pid, name, price in site_goods.get(cid, []):
+                candidates.append((pid, name, price, "site_top_category"))
 
     if len(candidates) < max(2, int(top_n * SEASONAL_CONFIG.get("fallback_min_fill_ratio", 0.5))):
         top = top_selling_products(limit=20, days_back=120)
+        names = dict(Product.objects.filter(id__in=top).values_list("id", "name"))
+        first_goods = _first_goods_by_product(top)
         for pid in top:
-            try:
-                prod = Product.objects.get(id=pid)
-                goods = Goods.objects.filter(product=prod).first()
-                candidates.append((prod.id, prod.name, float(goods.selling_price if goods else 0.0), "fallback"))
-            except Exception:
-                continue
+            if pid in names:
+                candidates.append((pid, names[pid], first_goods.get(pid, (None, 0.0))[1], "fallback"))
 
     pids = list({pid for (pid, _, _, _) in candidates})
     recent_cutoff = now - timedelta(days=SEASONAL_CONFIG.get("recency_days", 90))
@@ -380,39 +533,36 @@ def rules_based_recommendations_for_user(user_id, top_n=6):
     return [{k: v for k, v in d.items() if k != 'score'} for d in ranked[:top_n]]
 
 
-def prophet_based_recommendations(top_n=8, horizon_days=30, top_products_to_consider=50):
-    if not PROPHET_AVAILABLE:
-        return []
-
-    candidate_pids = top_selling_products(limit=top_products_to_consider, days_back=365)
-    if not candidate_pids:
-        return []
-
-    scores = {}
-    for pid in candidate_pids:
-        try:
-            score = forecast_growth_score_for_product(pid, horizon_days=horizon_days)
-            if score is not None:
-                scores[pid] = score
-        except Exception:
-            continue
-
-    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    recs = []
-    for pid, score in ranked[:top_n * 2]:
-        try:
-            prod = Product.objects.get(id=pid)
-            goods = Goods.objects.filter(product=prod).first()
-            recs.append({
-                "product_id": prod.id,
-                "product_name": prod.name,
-                "price": float(goods.selling_price) if goods and goods.selling_price else 0.0,
-                "forecast_score": float(score),
-                "sources": ["forecast"]
-            })
-        except Exception:
-            continue
+def prophet_based_recommendations(top_n=8, horizon_days=30):
+    """Rank products by growth scores precomputed by ``manage.py train_forecasts``.
 
+    Uses the scores of the configured forecast backend. Without precomputed
+    scores, falls back to the in-process seasonal-naive batch.
+    """
+    scores = list(
+        ForecastScore.objects
+        .filter(horizon_days=horizon_days, backend=resolve_forecast_backend())
+        .order_by("-score")
+        .values_list("product_id", "score")[: top_n * 2]
+    )
+    if not scores:
+        batch = batch_growth_scores(horizon_days=horizon_days)
+        scores = sorted(batch.items(), key=lambda x: x[1], reverse=True)[: top_n * 2]
+
+    pids = [pid for pid, _ in scores]
+    products = Product.objects.in_bulk(pids)
+    prices = {pid: price for pid, (_, price) in _first_goods_by_product(pids).items()}
+    recs = [
+        {
+            "product_id": pid,
+            "product_name": products[pid].name,
+            "price": prices.get(pid, 0.0),
+            "forecast_score": float(score),
+            "sources": ["forecast"],
+        }
+        for pid, score in scores
+        if pid in products
+    ]
     return recs[:top_n]
 
 
@@ -9,7 +9,8 @@ django.setup()
 
 from django.contrib.auth.models import User
 from django.utils import timezone
-from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord, Remittance
+from store import ledger
+from store.models import Profile, Wallet, Shop, Category, Product, Goods, OrderMaster, OrderDetails, SalesRecord
 
 COUNTRIES = [
     'Afghanistan', 'Albania', 'Algeria', 'Andorra', 'Angola', 'Antigua and Barbuda', 'Argentina', 'Armenia', 'Australia', 'Austria',
@@ -76,21 +77,21 @@ def create_users_and_profiles():
             last_name=f"Last{i+1}"
         )
         
-        profile = Profile.objects.create(
+        profile, _ = Profile.objects.update_or_create(
             user=user,
-            email=email,
-            phone=f"+1{random.randint(1000000000, 9999999999)}",
-            country=random.choice(COUNTRIES),
-            city=f"City{random.randint(1, 100)}",
-            address=f"{random.randint(1, 9999)} Main St, City{random.randint(1, 100)}",
-            is_seller=random.choice([True, False]),
-            gender=random.choice(['male', 'female'])
+            defaults=dict(
+                email=email,
+                phone=f"+1{random.randint(1000000000, 9999999999)}",
+                country=random.choice(COUNTRIES),
+                city=f"City{random.randint(1, 100)}",
+                address=f"{random.randint(1, 9999)} Main St, City{random.randint(1, 100)}",
+                is_seller=random.choice([True, False]),
+                gender=random.choice(['male', 'female']),
+            ),
         )
         
-        wallet = Wallet.objects.create(
-            user=user,
-            balance=Decimal(random.uniform(1000, 10000))
-        )
+        wallet, _ = Wallet.objects.get_or_create(user=user)
+        ledger.post(wallet.id, Decimal(random.uniform(1000, 10000)).quantize(ledger.CENT), 'deposit', 'Opening balance')
         
         users_created += 1
         if users_created % 50 == 0:
@@ -211,16 +212,12 @@ def create_transactions():
         goods = random.choice(goods_list)
         buyer = random.choice(buyers)
         
-        buyer_wallet = buyer.wallet
-        if buyer_wallet.balance < goods.selling_price:
-            buyer_wallet.balance += goods.selling_price * Decimal(2)
-            buyer_wallet.save()
-        
         order = OrderMaster.objects.create(
             user=buyer,
             shipping_address=f"{random.randint(1, 9999)} Main St, City{random.randint(1, 100)}, {random.choice(COUNTRIES)}",
             notes=f"Order note {i+1}",
             total_amount=goods.selling_price,
+            line_count=1,
             status='confirmed',
             order_date=timezone.now() - timedelta(days=random.randint(0, 365))
         )
@@ -244,25 +241,16 @@ def create_transactions():
             sale_date=order.order_date
         )
         
-        buyer_wallet.balance -= goods.selling_price
-        buyer_wallet.save()
-        
-        shop_owner_wallet = goods.shop.owner.wallet
-        shop_owner_wallet.balance += goods.selling_price
-        shop_owner_wallet.save()
-        
-        Remittance.objects.create(
-            wallet=buyer_wallet,
-            amount=goods.selling_price,
-            transaction_type='purchase',
-            description=f'Purchase of {goods.product.name} from {goods.shop.name}'
-        )
+        purchase = f'Purchase of {goods.product.name} from {goods.shop.name}'
+        if ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase, require_funds=True) is None:
+            ledger.post(buyer.wallet.id, goods.selling_price * Decimal(2), 'deposit', 'Top-up for generated orders')
+            ledger.post(buyer.wallet.id, goods.selling_price, 'purchase', purchase)
         
-        Remittance.objects.create(
-            wallet=shop_owner_wallet,
-            amount=goods.selling_price,
-            transaction_type='sale',
-            description=f'Sale of {goods.product.name} to {buyer.username}'
+        ledger.post(
+            goods.shop.owner.wallet.id,
+            goods.selling_price,
+            'sale',
+            f'Sale of {goods.product.name} to {buyer.username}'
         )
         
         goods.stock -= 1
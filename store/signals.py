@@ -1,9 +1,14 @@
+from decimal import Decimal
+
 from django.dispatch import receiver
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_init, post_migrate, post_save, post_delete
 from django.apps import apps
 
-from .models import Category
+from .models import Category, Goods, PriceChange, SalesRecord
 from .category_seed import ALL_CATEGORIES
+from .category_catalogue import invalidate_category_catalogue
+from .price_index import refresh_price_index
+from .pricing_cache import invalidate_goods, invalidate_item
 
 
 @receiver(post_migrate)
@@ -12,4 +17,61 @@ def seed_categories_on_migrate(sender, **kwargs):
 		return
 	if Category.objects.count() == 0:
 		for name in ALL_CATEGORIES:
-			Category.objects.get_or_create(name=name, defaults={'description': f'{name} category'}) 
\ No newline at end of file
+			Category.objects.get_or_create(name=name, defaults={'description': f'{name} category'})
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_catalogue(sender, **kwargs):
+	invalidate_category_catalogue()
+
+
+PRICE_INDEX_FIELDS = {'selling_price', 'is_available', 'product', 'product_id'}
+
+
+@receiver(post_save, sender=Goods)
+def update_price_index_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+	if raw or (update_fields is not None and not PRICE_INDEX_FIELDS & set(update_fields)):
+		return
+	refresh_price_index(instance.product_id)
+
+
+@receiver(post_delete, sender=Goods)
+def update_price_index_on_delete(sender, instance, **kwargs):
+	refresh_price_index(instance.product_id, create=False)
+
+
+@receiver(post_init, sender=Goods)
+def remember_selling_price(sender, instance, **kwargs):
+	instance._original_selling_price = instance.__dict__.get('selling_price')
+
+
+@receiver(post_save, sender=Goods)
+def record_price_change(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+	old_price = getattr(instance, '_original_selling_price', None)
+	new_price = instance.selling_price
+	instance._original_selling_price = new_price
+	if raw or created or old_price is None:
+		return
+	if update_fields is not None and 'selling_price' not in update_fields:
+		return
+	if Decimal(str(old_price)) == Decimal(str(new_price)):
+		return
+	PriceChange.objects.create(
+		goods=instance,
+		old_price=old_price,
+		new_price=new_price,
+		source=getattr(instance, '_price_change_source', 'manual'),
+	)
+
+
+@receiver(post_save, sender=Goods)
+@receiver(post_delete, sender=Goods)
+def invalidate_goods_recommendation(sender, instance, **kwargs):
+	invalidate_goods(instance.pk)
+
+
+@receiver(post_save, sender=SalesRecord)
+@receiver(post_delete, sender=SalesRecord)
+def invalidate_sold_item_recommendation(sender, instance, **kwargs):
+	invalidate_item(instance.shop_id, instance.product_id)
@@ -1,2 +1,255 @@
-from django.test import TestCase
+import math
+import random
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from experta import Rule
+
+from .copurchase import CoPurchaseMatrix, copurchased_by_query
+from .elasticity import elasticity_label, estimate_elasticities
+from .EYAD_pricing_experta import PricingExpert, ProductFact, recommend_from_facts
+from .memory_cache import SizedLRUCache
+from .models import Category, Goods, OrderDetails, OrderMaster, Product, SalesRecord, Shop, StockReservation
+from .pricing_decision_table import FACT_FIELDS, DecisionTable, compile_rules, recommend_batch
+
+
+FACT_LABELS = {
+    'sales': ['low', 'medium', 'high', 'very_high', 'stable'],
+    'stock': ['low', 'medium', 'high', 'very_high'],
+    'competition': ['pricier', 'cheaper', 'equal'],
+    'rating': ['unknown', 'poor', 'average', 'good', 'excellent'],
+    'favorites': ['low', 'medium', 'high'],
+    'margin': ['low', 'good', 'very_high'],
+    'trend': ['rising', 'falling', 'flat'],
+    'age': ['new', 'mid', 'old'],
+    'season': ['peak', 'off', 'normal'],
+    'elasticity': ['elastic', 'inelastic', 'unknown'],
+}
+
+
+class _Goods:
+    def __init__(self, selling_price, purchase_price):
+        self.selling_price = selling_price
+        self.purchase_price = purchase_price
+
+
+def _random_case(rng):
+    facts = {f: rng.choice(FACT_LABELS[f]) for f in FACT_FIELDS}
+    purchase = round(rng.uniform(1, 200), 2)
+    selling = round(purchase * rng.uniform(0.9, 2.0), 2)
+    return facts, _Goods(selling, purchase)
+
+
+class DecisionTableParityTests(SimpleTestCase):
+    """The compiled decision table must agree with the experta engine.
+
+    experta's firing order for simultaneously active rules depends on hashing,
+    so reasons are compared as multisets and percentages with a tolerance.
+    """
+
+    def assertSameRecommendation(self, expected, actual, facts):
+        msg = f"facts={facts}"
+        self.assertEqual(expected['action'], actual['action'], msg)
+        self.assertEqual(expected['suggested_price'], actual['suggested_price'], msg)
+        self.assertTrue(math.isclose(expected['pct'], actual['pct'], rel_tol=1e-9, abs_tol=1e-12), msg)
+        self.assertEqual(sorted(expected['reasons']), sorted(actual['reasons']), msg)
+        self.assertEqual(expected['facts'], actual['facts'], msg)
+
+    def test_compiles_every_rule(self):
+        rules = compile_rules()
+        self.assertEqual(len(rules), sum(isinstance(v, Rule) for v in vars(PricingExpert).values()))
+        self.assertEqual(rules[0].conditions, {'sales': 'low', 'stock': 'high'})
+        self.assertEqual(rules[0].action, 'decrease')
+
+    def test_rejects_rules_it_cannot_compile(self):
+        class Unsupported(PricingExpert):
+            @Rule(ProductFact(sales='low'), ProductFact(stock='high'))
+            def r99(self):
+                self._push('keep', 0.0, "two facts")
+
+        with self.assertRaises(ValueError):
+            compile_rules(Unsupported)
+
+    def test_each_rule_alone(self):
+        table = DecisionTable()
+        for rule in table.rules:
+            facts = {f: 'none' for f in FACT_FIELDS}
+            facts.update(rule.conditions)
+            goods = _Goods(100.0, 50.0)
+            expected = recommend_from_facts(goods, facts)
+            actual = recommend_batch([goods], [facts])[0]
+            self.assertSameRecommendation(expected, actual, facts)
+
+    def test_random_fact_combinations(self):
+        rng = random.Random(1234)
+        for min_margin in (None, 0.0, 0.3):
+            cases = [_random_case(rng) for _ in range(400)]
+            goods_list = [g for _, g in cases]
+            facts_list = [f for f, _ in cases]
+            actual = recommend_batch(goods_list, facts_list, min_margin=min_margin)
+            for (facts, goods), got in zip(cases, actual):
+                self.assertSameRecommendation(recommend_from_facts(goods, facts, min_margin=min_margin), got, facts)
+
+    def test_no_rules_fired(self):
+        facts = {f: 'none' for f in FACT_FIELDS}
+        goods = _Goods(10.0, 5.0)
+        self.assertSameRecommendation(recommend_from_facts(goods, facts), recommend_batch([goods], [facts])[0], facts)
+
+
+class CoPurchaseMatrixTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='copurchase-owner')
+        shop = Shop.objects.create(owner=owner, name='Co-purchase shop')
+        category = Category.objects.create(name='Co-purchase category')
+        cls.goods = {}
+        for name in 'abcd':
+            product = Product.objects.create(name=name, category=category)
+            cls.goods[name] = Goods.objects.create(
+                shop=shop, product=product, purchase_price=Decimal('1.00'), selling_price=Decimal('2.00'), stock=10
+            )
+        cls.buyer = User.objects.create(username='copurchase-buyer')
+        other = User.objects.create(username='copurchase-other')
+        cls.order(cls.buyer, a=1, b=1)
+        # Holds both of the buyer's products: its "c" must be counted once, not once per product.
+        cls.order(other, a=1, b=1, c=2)
+        cls.order(other, a=1, d=3)
+        cls.order(other, c=5, days_ago=400)
+
+    @classmethod
+    def order(cls, user, days_ago=1, **quantities):
+        order = OrderMaster.objects.create(user=user, shipping_address='test')
+        OrderMaster.objects.filter(pk=order.pk).update(order_date=timezone.now() - timedelta(days=days_ago))
+        for name, quantity in quantities.items():
+            OrderDetails.objects.create(order=order, goods=cls.goods[name], quantity=quantity, price=Decimal('2.00') * quantity)
+
+    def pid(self, name):
+        return self.goods[name].product_id
+
+    def test_counts_each_related_order_once(self):
+        user_pids = [self.pid('a'), self.pid('b')]
+        matrix = CoPurchaseMatrix.build(180)
+        expected = [(self.pid('d'), 3), (self.pid('c'), 2)]
+        self.assertEqual(matrix.copurchased_with(user_pids), expected)
+        self.assertEqual(copurchased_by_query(user_pids, timezone.now() - timedelta(days=180)), expected)
+
+    def test_refresh_matches_build(self):
+        user_pids = [self.pid('a'), self.pid('b')]
+        refreshed = CoPurchaseMatrix.build(180, now=timezone.now() - timedelta(days=2)).refresh()
+        self.assertEqual(refreshed.copurchased_with(user_pids), CoPurchaseMatrix.build(180).copurchased_with(user_pids))
+
+
+class SizedLRUCacheTests(SimpleTestCase):
+    def compute_in_thread(self, cache, key, value):
+        started, release, results = threading.Event(), threading.Event(), []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return value
+
+        thread = threading.Thread(target=lambda: results.append(cache.get_or_compute(key, compute)))
+        thread.start()
+        started.wait(5)
+        return thread, release, results
+
+    def test_delete_during_compute_is_not_overwritten(self):
+        cache = SizedLRUCache(max_bytes=1024 * 1024)
+        thread, release, results = self.compute_in_thread(cache, 'k', 'stale')
+        cache.delete('k')
+        release.set()
+        thread.join(5)
+        self.assertEqual(results, ['stale'])
+        self.assertIsNone(cache.get('k'))
+        self.assertEqual(cache.get_or_compute('k', lambda: 'fresh'), 'fresh')
+
+    def test_clear_during_compute_is_not_overwritten(self):
+        cache = SizedLRUCache(max_bytes=1024 * 1024)
+        thread, release, _ = self.compute_in_thread(cache, 'k', 'stale')
+        cache.clear()
+        release.set()
+        thread.join(5)
+        self.assertIsNone(cache.get('k'))
+
+    def test_compute_is_stored_without_invalidation(self):
+        cache = SizedLRUCache(max_bytes=1024 * 1024)
+        thread, release, _ = self.compute_in_thread(cache, 'k', 'value')
+        release.set()
+        thread.join(5)
+        self.assertEqual(cache.get('k'), 'value')
+
+
+class ElasticityEstimateTests(TestCase):
+    """Sales built as ``quantity = a * price ** slope`` must fit back to ``slope``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='elasticity-owner')
+        buyer = User.objects.create(username='elasticity-buyer')
+        shop = Shop.objects.create(owner=owner, name='Elasticity shop')
+        category = Category.objects.create(name='Elasticity category')
+        order = OrderMaster.objects.create(user=buyer, shipping_address='test')
+        cls.products = {}
+        records = []
+        series = {
+            # 40000 / p**2 and 100 / p**0.5 give exact integer quantities, so the fits are exact.
+            'elastic': [(10, 400), (20, 100), (25, 64), (40, 25), (50, 16)],
+            'inelastic': [(1, 100), (4, 50), (16, 25), (25, 20), (100, 10)],
+            'sparse': [(10, 400), (20, 100), (25, 64)],
+        }
+        for name, points in series.items():
+            product = Product.objects.create(name=name, category=category)
+            goods = Goods.objects.create(
+                shop=shop, product=product, purchase_price=Decimal('0.50'), selling_price=Decimal('1.00'), stock=10
+            )
+            detail = OrderDetails.objects.create(order=order, goods=goods, quantity=1, price=Decimal('1.00'))
+            cls.products[name] = product.pk
+            for price, quantity in points * 2:
+                records.append(SalesRecord(
+                    shop=shop, order_detail=detail, product=product, quantity_sold=quantity,
+                    unit_price=Decimal(price), total_revenue=Decimal(price * quantity), profit_margin=Decimal('0'),
+                ))
+        SalesRecord.objects.bulk_create(records)
+
+    def test_recovers_known_slopes(self):
+        estimates = estimate_elasticities(days_back=30)
+        for name, expected, label in (('elastic', -2.0, 'elastic'), ('inelastic', -0.5, 'inelastic')):
+            slope, n_obs, r2 = estimates[self.products[name]]
+            self.assertAlmostEqual(slope, expected, places=9)
+            self.assertEqual(n_obs, 10)
+            self.assertAlmostEqual(r2, 1.0, places=9)
+            self.assertEqual(elasticity_label(slope), label)
+
+    def test_skips_products_with_too_few_observations(self):
+        self.assertNotIn(self.products['sparse'], estimate_elasticities(days_back=30))
+
+
+class CartQuantityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='cart-owner')
+        cls.buyer = User.objects.create(username='cart-buyer')
+        shop = Shop.objects.create(owner=owner, name='Cart shop')
+        product = Product.objects.create(name='Cart product', category=Category.objects.create(name='Cart category'))
+        cls.goods = Goods.objects.create(
+            shop=shop, product=product, purchase_price=Decimal('1.00'), selling_price=Decimal('2.00'), stock=10
+        )
+
+    def setUp(self):
+        self.client.force_login(self.buyer)
+
+    def test_rejects_invalid_quantities(self):
+        for view in ('store:add_to_cart', 'store:update_cart'):
+            for quantity in ('0', '-3', 'abc'):
+                response = self.client.post(reverse(view, args=[self.goods.pk]), {'quantity': quantity})
+                self.assertRedirects(response, reverse('store:cart'), fetch_redirect_response=False)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_adds_positive_quantity(self):
+        self.client.post(reverse('store:add_to_cart', args=[self.goods.pk]), {'quantity': '2'})
+        self.assertEqual(StockReservation.objects.get(user=self.buyer, goods=self.goods).quantity, 2)
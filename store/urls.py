@@ -25,11 +25,15 @@ urlpatterns = [
     path('', views.home_view, name='home'),
     path('products/', views.product_list, name='product_list'),
     path('category/<int:pk>/', views.category_products, name='category_products'),
+    path('category/<int:pk>/trending/', views.category_trending, name='category_trending'),
+    path('category/<int:pk>/trending/<str:period>/', views.category_trending, name='category_trending'),
     
     path('shop/create/', views.create_shop, name='create_shop'),
     path('shop/<int:pk>/', views.shop_detail, name='shop_detail'),
     path('shop/<int:pk>/manage/', views.manage_shop, name='manage_shop'),
     path('shop/<int:pk>/sales/', views.shop_sales_analytics, name='shop_sales_analytics'),
+    path('shop/<int:pk>/trending/', views.shop_trending, name='shop_trending'),
+    path('shop/<int:pk>/trending/<str:period>/', views.shop_trending, name='shop_trending'),
     
     path('product/<int:pk>/edit/', views.edit_product, name='edit_product'),
     path('product/<int:pk>/delete/', views.delete_product, name='delete_product'),
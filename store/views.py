@@ -1,17 +1,25 @@
+from decimal import Decimal, InvalidOperation
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db.models import Q
 from django.contrib.auth.models import User
-from .models import Product, Category, Shop, Goods, OrderMaster, OrderDetails, Favorite, Review
+from .models import Product, Category, Shop, Goods, Favorite, Review, ProductPriceIndex
 from .forms import ShopForm, ProductForm, GoodsForm, CheckoutForm, AddGoodsToShopForm
 from .category_seed import ALL_CATEGORIES
+from .category_catalogue import invalidate_category_catalogue
+from .checkout import place_order, existing_order, lines_from_cart, CheckoutError, InsufficientFunds
+from . import reservations
+from .order_history import order_history_page, order_with_details
+from .scoped_trending import get_category_trending, get_shop_trending, normalize_period, TRENDING_PERIOD_DAYS
+from .price_index import price_position
 from django.utils import timezone
 from django.db import models
 from . import recommender
 from .hybrid_recommender import get_hybrid_recommendations
-from .fp_recommender import get_fp_recommendations_for_product
+from .fp_recommender import get_fp_recommendations_for_product, BUNDLE_DISCOUNT_PERCENTAGE
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .recommender import recommend_from_shared_category, recommend_from_new_category,get_cluster_stats
@@ -28,6 +36,7 @@ def home_view(request):
 		Category.objects.bulk_create([
 			Category(name=name, description=f"{name} category") for name in ALL_CATEGORIES
 		])
+		invalidate_category_catalogue()
 	
 	categories = Category.objects.all()[:6]
 	featured_products = Product.objects.all()[:8]
@@ -304,13 +313,24 @@ def cart_view(request):
 def add_to_cart(request, goods_id):
     goods = get_object_or_404(Goods, id=goods_id, is_available=True)
     cart = Cart(request)
-    quantity = int(request.POST.get('quantity', 1))
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        quantity = 0
+    
+    if quantity <= 0:
+        messages.error(request, 'Invalid quantity.')
+        return redirect('store:cart')
+    
+    in_cart = cart.quantity_of(goods)
     
-    if quantity <= goods.stock:
+    try:
+        reservations.reserve(request.user, goods, in_cart + quantity)
+    except reservations.ReservationError as e:
+        messages.error(request, f'Only {max(e.available - in_cart, 0)} more units available in stock.')
+    else:
         cart.add(goods=goods, quantity=quantity)
         messages.success(request, f'{goods.product.name} added to cart!')
-    else:
-        messages.error(request, f'Only {goods.stock} units available in stock.')
     
     return redirect('store:cart')
 
@@ -320,6 +340,7 @@ def remove_from_cart(request, goods_id):
     goods = get_object_or_404(Goods, id=goods_id)
     cart = Cart(request)
     cart.remove(goods)
+    reservations.release(request.user, [goods.id])
     messages.success(request, f'{goods.product.name} removed from cart!')
     return redirect('store:cart')
 
@@ -328,13 +349,22 @@ def remove_from_cart(request, goods_id):
 def update_cart(request, goods_id):
     goods = get_object_or_404(Goods, id=goods_id)
     cart = Cart(request)
-    quantity = int(request.POST.get('quantity', 1))
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        quantity = 0
+    
+    if quantity <= 0:
+        messages.error(request, 'Invalid quantity.')
+        return redirect('store:cart')
     
-    if quantity > 0 and quantity <= goods.stock:
+    try:
+        reservations.reserve(request.user, goods, quantity)
+    except reservations.ReservationError as e:
+        messages.error(request, f'Invalid quantity. Stock available: {e.available}')
+    else:
         cart.add(goods=goods, quantity=quantity, override_quantity=True)
         messages.success(request, f'{goods.product.name} quantity updated!')
-    else:
-        messages.error(request, f'Invalid quantity. Stock available: {goods.stock}')
     
     return redirect('store:cart')
 
@@ -343,6 +373,13 @@ def update_cart(request, goods_id):
 def checkout(request):
     cart = Cart(request)
     
+    if request.method == 'POST':
+        # A resubmitted form (double click, client or proxy retry) lands on the order it already placed.
+        order = existing_order(request.user, request.POST.get('idempotency_key'))
+        if order is not None:
+            messages.info(request, f'Order #{order.id} was already placed.')
+            return redirect('store:order_detail', pk=order.pk)
+    
     if len(cart) == 0:
         messages.warning(request, 'Your cart is empty.')
         return redirect('store:cart')
@@ -350,79 +387,26 @@ def checkout(request):
     if request.method == 'POST':
         form = CheckoutForm(request.POST)
         if form.is_valid():
-            order = OrderMaster.objects.create(
-                user=request.user,
-                shipping_address=form.cleaned_data['shipping_address'],
-                notes=form.cleaned_data['notes'],
-                total_amount=cart.get_total_price()
-            )
-            
-            for item in cart:
-                order_detail = OrderDetails.objects.create(
-                    order=order,
-                    goods=item['goods'],
-                    quantity=item['quantity'],
-                    price=item['total_price']
-                )
-                
-                from .models import SalesRecord
-                unit_price = item['goods'].selling_price
-                total_revenue = item['total_price']
-                profit_margin = total_revenue - (item['goods'].purchase_price * item['quantity'])
-                
-                SalesRecord.objects.create(
-                    shop=item['goods'].shop,
-                    order_detail=order_detail,
-                    product=item['goods'].product,
-                    quantity_sold=item['quantity'],
-                    unit_price=unit_price,
-                    total_revenue=total_revenue,
-                    profit_margin=profit_margin
-                )
-                
-                shop_owner_wallet = item['goods'].shop.owner.wallet
-                shop_owner_wallet.balance += total_revenue
-                shop_owner_wallet.save()
-                
-                from .models import Remittance
-                Remittance.objects.create(
-                    wallet=shop_owner_wallet,
-                    amount=total_revenue,
-                    transaction_type='sale',
-                    description=f'Sale of {item["goods"].product.name} x{item["quantity"]} (Order #{order.id})'
+            payment_method = form.cleaned_data['payment_method']
+            try:
+                order = place_order(
+                    request.user,
+                    lines_from_cart(cart),
+                    shipping_address=form.cleaned_data['shipping_address'],
+                    notes=form.cleaned_data['notes'],
+                    payment_method=payment_method,
+                    idempotency_key=form.cleaned_data['idempotency_key'],
                 )
-                
-                goods = item['goods']
-                goods.stock -= item['quantity']
-                if goods.stock == 0:
-                    goods.is_available = False
-                goods.save()
+            except InsufficientFunds:
+                messages.error(request, 'Insufficient wallet balance.')
+                return redirect('store:wallet')
+            except CheckoutError as e:
+                messages.error(request, str(e))
+                return redirect('store:cart')
             
-            payment_method = form.cleaned_data['payment_method']
             if payment_method == 'wallet':
-                wallet = request.user.wallet
-                if wallet.balance >= cart.get_total_price():
-                    wallet.balance -= cart.get_total_price()
-                    wallet.save()
-                    
-                    from .models import Remittance
-                    Remittance.objects.create(
-                        wallet=wallet,
-                        amount=cart.get_total_price(),
-                        transaction_type='purchase',
-                        description=f'Payment for order #{order.id}'
-                    )
-                    
-                    order.status = 'confirmed'
-                    order.save()
-                    messages.success(request, f'Order #{order.id} placed successfully! Payment processed from wallet.')
-                else:
-                    order.delete()
-                    messages.error(request, 'Insufficient wallet balance.')
-                    return redirect('store:wallet')
+                messages.success(request, f'Order #{order.id} placed successfully! Payment processed from wallet.')
             else:  # Cash on Delivery
-                order.status = 'pending'
-                order.save()
                 messages.success(request, f'Order #{order.id} placed successfully! Pay on delivery.')
             
             cart.clear()
@@ -430,6 +414,7 @@ def checkout(request):
             return redirect('store:order_detail', pk=order.pk)
     else:
         form = CheckoutForm()
+        reservations.extend(request.user)
     
     return render(request, 'store/checkout.html', {
         'cart': cart,
@@ -439,13 +424,18 @@ def checkout(request):
 
 @login_required
 def order_list(request):
-    orders = OrderMaster.objects.filter(user=request.user).order_by('-order_date')
-    return render(request, 'store/order_list.html', {'orders': orders})
+    cursor = request.GET.get('after')
+    orders, next_cursor = order_history_page(request.user, cursor)
+    return render(request, 'store/order_list.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
 
 
 @login_required
 def order_detail(request, pk):
-    order = get_object_or_404(OrderMaster, pk=pk, user=request.user)
+    order = get_object_or_404(order_with_details(), pk=pk, user=request.user)
     return render(request, 'store/order_detail.html', {'order': order})
 
 
@@ -498,7 +488,7 @@ def add_review(request, product_id):
 @login_required
 def wallet_view(request):
     wallet = request.user.wallet
-    remittances = wallet.remittances.all().order_by('-created_at')[:10]
+    remittances = wallet.remittances.order_by('-sequence')[:10]
     
     context = {
         'wallet': wallet,
@@ -529,23 +519,33 @@ def repricing_recommendation(request, pk):
         return redirect('store:manage_shop', pk=goods.shop.pk)
     
     try:
-        from .EYAD_pricing_experta import recommend_for_goods, apply_recommendation
-        
-        recommendation = recommend_for_goods(goods_id=pk, window_days=30)
+        from .EYAD_pricing_experta import apply_recommendation, FactContext
+        from .pricing_cache import get_recommendation, recommendation_for_fingerprint
         
         if request.method == 'POST':
             action = request.POST.get('action')
-            if action == 'apply' and recommendation.get('action') in ('increase', 'decrease'):
-                result = apply_recommendation(goods_id=pk, recommendation=recommendation, dry_run=False)
-                if result['updated']:
-                    messages.success(request, f'Price updated successfully! New price: ${result["new_price"]:.2f}')
-                else:
-                    messages.warning(request, 'No price change was applied.')
-                return redirect('store:manage_shop', pk=goods.shop.pk)
+            if action == 'apply':
+                recommendation = recommendation_for_fingerprint(goods, request.POST.get('fingerprint'), window_days=30)
+                if recommendation is None:
+                    messages.warning(request, 'The recommendation changed since it was shown. Please review it again.')
+                    return redirect('store:repricing_recommendation', pk=pk)
+                if recommendation.get('action') in ('increase', 'decrease'):
+                    result = apply_recommendation(goods_id=pk, recommendation=recommendation, dry_run=False)
+                    if result['updated']:
+                        messages.success(request, f'Price updated successfully! New price: ${result["new_price"]:.2f}')
+                    else:
+                        messages.warning(request, 'No price change was applied.')
+                    return redirect('store:manage_shop', pk=goods.shop.pk)
         
+        fact_context = FactContext()
+        recommendation = get_recommendation(goods, window_days=30, context=fact_context)
+        
+        fact_timings = fact_context.timing_report()
         context = {
             'goods': goods,
             'recommendation': recommendation,
+            'fact_timings': fact_timings,
+            'fact_total_ms': round(sum(t['ms'] for t in fact_timings), 2),
         }
         return render(request, 'store/repricing_recommendation.html', context)
         
@@ -608,6 +608,36 @@ def trending_recommendations(request, period="day"):
     return render(request, "store/trending_recommendations.html", context)
 
 
+@login_required
+def category_trending(request, pk, period="week"):
+    category = get_object_or_404(Category, pk=pk)
+    period = normalize_period(period)
+    context = {
+        "scope_name": category.name,
+        "scope_url": "store:category_trending",
+        "scope_id": category.pk,
+        "period": period,
+        "periods": list(TRENDING_PERIOD_DAYS),
+        "recommendations": get_category_trending(category.pk, period=period),
+    }
+    return render(request, "store/scoped_trending.html", context)
+
+
+@login_required
+def shop_trending(request, pk, period="week"):
+    shop = get_object_or_404(Shop, pk=pk)
+    period = normalize_period(period)
+    context = {
+        "scope_name": shop.name,
+        "scope_url": "store:shop_trending",
+        "scope_id": shop.pk,
+        "period": period,
+        "periods": list(TRENDING_PERIOD_DAYS),
+        "recommendations": get_shop_trending(shop.pk, period=period),
+    }
+    return render(request, "store/scoped_trending.html", context)
+
+
 @login_required
 def hybrid_recommendations_view(request):
     user_id = request.user.id
@@ -620,8 +650,17 @@ def hybrid_recommendations_view(request):
 
 @login_required
 def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk)
-    goods_list = Goods.objects.filter(product=product, is_available=True)
+    product = get_object_or_404(Product.objects.select_related('price_index'), pk=pk)
+    goods_list = list(reservations.with_available_to_sell(
+        Goods.objects.filter(product=product, is_available=True).select_related('shop'), user=request.user
+    ))
+    try:
+        market = product.price_index if product.price_index.offer_count else None
+    except ProductPriceIndex.DoesNotExist:
+        market = None
+    if market:
+        for goods in goods_list:
+            goods.market_position = price_position(float(goods.selling_price), market.median_price)
     reviews = Review.objects.filter(product=product).order_by('-created_at')
     related_products = Product.objects.filter(category=product.category).exclude(pk=pk)[:4]
 
@@ -634,6 +673,7 @@ def product_detail(request, pk):
     context = {
         "product": product,
         "goods_list": goods_list,
+        "market": market,
         "reviews": reviews,
         "related_products": related_products,
         "is_favorited": is_favorited,
@@ -646,37 +686,26 @@ def product_detail(request, pk):
 def add_bundle_to_cart(request):
     if request.method == "POST":
         product_ids = request.POST.getlist("product_ids")
-        discount = float(request.POST.get("discount", 0))
+        # The discount is echoed back by the bundle form; only accept what bundles actually offer.
+        try:
+            discount = Decimal(request.POST.get("discount") or 0)
+            valid = 0 <= discount <= BUNDLE_DISCOUNT_PERCENTAGE
+        except InvalidOperation:
+            valid = False
+        if not valid:
+            messages.error(request, "That bundle discount is not available.")
+            return redirect("store:cart")
+        cart = Cart(request)
         
-        cart = request.session.get("cart", {})
-
         for pid in product_ids:
+            goods = Goods.objects.filter(product_id=pid, is_available=True).first()
+            if not goods:
+                continue
             try:
-                product = Product.objects.get(pk=pid)
-                goods = Goods.objects.filter(product=product, is_available=True).first()
-                if not goods:
-                    continue
-
-                price = float(goods.selling_price)
-                discounted_price = price * (1 - discount / 100)
-
-                if str(goods.id) not in cart:
-                    cart[str(goods.id)] = {
-                        "product_id": product.id,
-                        "name": product.name,
-                        "quantity": 1,
-                        "price": discounted_price,
-                        "original_price": price,
-                        "discount": discount,
-                    }
-                else:
-                    cart[str(goods.id)]["quantity"] += 1
-
-            except Product.DoesNotExist:
+                reservations.reserve(request.user, goods, cart.quantity_of(goods) + 1)
+            except reservations.ReservationError:
                 continue
-
-        request.session["cart"] = cart
-        request.session.modified = True
+            cart.add(goods=goods, quantity=1, discount=discount)
 
         messages.success(request, " Bundle added to cart with discount applied!")
         return redirect("store:cart")